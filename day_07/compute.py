@@ -6,6 +6,7 @@ from typing import (
     Dict,
     List,
     Self,
+    Tuple,
 )
 
 
@@ -51,6 +52,18 @@ class Kind(Enum):
         return self.value < other.value
 
 
+# sorted count of each card in a hand -> kind of that hand
+_kind_table: Dict[Tuple[int, ...], Kind] = {
+    (5,): Kind.FiveOfKind,
+    (4, 1): Kind.FourOfKind,
+    (3, 2): Kind.FullHouse,
+    (3, 1, 1): Kind.ThreeOfKind,
+    (2, 2, 1): Kind.TwoPair,
+    (2, 1, 1, 1): Kind.OnePair,
+    (1, 1, 1, 1, 1): Kind.HighCard,
+}
+
+
 @dataclasses.dataclass(frozen=True)
 class Hand:
     cards: List[Card]
@@ -59,56 +72,69 @@ class Hand:
 
     @classmethod
     def _get_kind(cls, cards: List[Card]) -> Kind:
+        """Kind of the hand when every card (including jockers) stands for itself"""
         assert len(cards) == 5
         hand: Dict[Card, int] = defaultdict(int)
         for card in cards:
             hand[card] += 1
-
-        max_same = max(hand.values())
-        min_same = min(hand.values())
-        if max_same == 5:
-            return Kind.FiveOfKind
-        elif max_same == 1:
-            return Kind.HighCard
-        elif max_same == 4:
-            return Kind.FourOfKind
-        elif max_same == 3:
-            # either full house or three of kind
-            if min_same == 2:
-                return Kind.FullHouse
-            return Kind.ThreeOfKind
-        elif max_same == 2:
-            n_pairs = sum((1 for c in hand.values() if c == 2))
-            if n_pairs == 2:
-                return Kind.TwoPair
-            return Kind.OnePair
-        else:
-            raise ValueError(f'Unexpected {cards}')
+        return _kind_table[tuple(sorted(hand.values(), reverse=True))]
 
     @classmethod
     def get_kind(cls, original_cards: List[Card]) -> Kind:
-        """Brute force to get best kind"""
-        best_kind = cls._get_kind(original_cards)
-        if Card.Jocker not in original_cards:
-            return best_kind
-        other_cards = {c for c in original_cards if c != Card.Jocker}
-        for card in other_cards:
-            alt_cards = [original if original != Card.Jocker else card for original in original_cards]
-            if best_kind < (alt_kind := cls._get_kind(alt_cards)):
-                best_kind = alt_kind
-        return best_kind
+        """Best kind of the hand, jockers standing in for any other card.
+
+        The best use of jockers is always to copy the most common other card, so we count
+        the non-jocker cards in one pass, add the jockers to the biggest count and look
+        the resulting signature up.
+        """
+        assert len(original_cards) == 5
+        hand: Dict[Card, int] = defaultdict(int)
+        n_jockers = 0
+        for card in original_cards:
+            if card == Card.Jocker:
+                n_jockers += 1
+            else:
+                hand[card] += 1
+
+        if n_jockers == 5:
+            return Kind.FiveOfKind
+        signature = sorted(hand.values(), reverse=True)
+        signature[0] += n_jockers
+        return _kind_table[tuple(signature)]
 
     @classmethod
-    def from_line(cls, line: str) -> Self:
-        cards_str, bid_str = line.split(' ')
-        cards = Card.from_line(cards_str)
-        kind = cls.get_kind(cards)
+    def from_cards(cls, cards: List[Card], bid: int) -> Self:
         return cls(
             cards,
-            kind,
-            int(bid_str),
+            cls.get_kind(cards),
+            bid,
         )
 
+    @classmethod
+    def from_line(cls, line: str) -> Self:
+        cards_str, bid_str = line.split(' ')
+        return cls.from_cards(Card.from_line(cards_str), int(bid_str))
+
+    @classmethod
+    def from_file_both_rules(cls, filename: str) -> Tuple[List[Self], List[Self]]:
+        """Load the hands once for both rules: J as a jack and J as a jocker"""
+        print(f'Loading {filename}')
+        hands = []
+        jocker_hands = []
+        with open(filename, 'r') as fin:
+            for line in fin:
+                line = line.replace('\n', '')
+                if not line:
+                    continue
+                cards_str, bid_str = line.split(' ')
+                cards = Card.from_line(cards_str)
+                bid = int(bid_str)
+                hands.append(cls.from_cards(cards, bid))
+                jocker_cards = [Card.Jocker if card == Card.Jack else card for card in cards]
+                jocker_hands.append(cls.from_cards(jocker_cards, bid))
+        print(f'  -> {len(hands)} hands loaded')
+        return hands, jocker_hands
+
     @classmethod
     def from_file(cls, filename: str, *, j_is_joker: bool = False) -> List[Self]:
         print(f'Loading {filename}')
@@ -124,6 +150,11 @@ class Hand:
         print(f'  -> {len(hands)} hands loaded')
         return hands
 
+    @property
+    def sort_key(self) -> Tuple[int, ...]:
+        """Same order as __lt__ but computed once per hand"""
+        return self.kind.value, *(card.score for card in self.cards)
+
     def __lt__(self, other: Self) -> bool:
         if self.kind != other.kind:
             return self.kind < other.kind
@@ -135,13 +166,14 @@ class Hand:
 
 
 def compute_score(hands: List[Hand]) -> int:
-    sorted_hands = sorted(hands)
+    sorted_hands = sorted(hands, key=lambda hand: hand.sort_key)
     return sum((i * hand.bid for i, hand in enumerate(sorted_hands, start=1)))
 
 
 def main(filename: str):
-    print(f'Q1: total score: {compute_score(Hand.from_file(filename))}')
-    print(f'Q2: total score: {compute_score(Hand.from_file(filename, j_is_joker=True))}')
+    hands, jocker_hands = Hand.from_file_both_rules(filename)
+    print(f'Q1: total score: {compute_score(hands)}')
+    print(f'Q2: total score: {compute_score(jocker_hands)}')
 
 
 if __name__ == '__main__':
@@ -1,3 +1,4 @@
+import itertools
 import os
 
 import pytest
@@ -66,11 +67,28 @@ class TestHand:
             ('T55*5', Kind.FourOfKind),
             ('QQQ*A', Kind.FourOfKind),
             ('T55*5', Kind.FourOfKind),
+            ('*****', Kind.FiveOfKind),
+            ('****2', Kind.FiveOfKind),
+            ('2*3*4', Kind.ThreeOfKind),
+            ('23*45', Kind.OnePair),
+            ('2233*', Kind.FullHouse),
         ),
     )
     def test_get_kind(self, cards_str: str, kind: Kind):
         cards = Card.from_line(cards_str)
-        assert Hand.get_kind(cards)
+        assert Hand.get_kind(cards) == kind
+
+    @pytest.mark.slow
+    def test_get_kind_all_hands(self):
+        def brute_force(cards):
+            best_kind = Hand._get_kind(cards)
+            for card in Card:
+                alt_cards = [c if c != Card.Jocker else card for c in cards]
+                best_kind = max(best_kind, Hand._get_kind(alt_cards))
+            return best_kind
+
+        for cards in itertools.product((Card.Jocker, Card.Two, Card.Three, Card.Four, Card.Ace), repeat=5):
+            assert Hand.get_kind(list(cards)) == brute_force(list(cards)), cards
 
     @pytest.mark.parametrize(
         'hand_a_str, hand_b_str, exp',
@@ -102,3 +120,15 @@ class TestQ2:
 
     def test_input_txt(self, input_txt):
         assert compute_score(Hand.from_file(input_txt, j_is_joker=True)) == 255632664
+
+
+class TestBothRules:
+    def test_small_ex(self, small_ex_txt):
+        hands, jocker_hands = Hand.from_file_both_rules(small_ex_txt)
+        assert hands == Hand.from_file(small_ex_txt)
+        assert jocker_hands == Hand.from_file(small_ex_txt, j_is_joker=True)
+
+    def test_input_txt(self, input_txt):
+        hands, jocker_hands = Hand.from_file_both_rules(input_txt)
+        assert compute_score(hands) == 251927063
+        assert compute_score(jocker_hands) == 255632664
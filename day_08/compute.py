@@ -1,7 +1,10 @@
 import dataclasses
+import functools
 import math
 import re
 from argparse import ArgumentParser
+from array import array
+from concurrent.futures import ProcessPoolExecutor
 from typing import (
     ClassVar,
     Dict,
@@ -26,16 +29,195 @@ class Node:
         return cls(name=name, left=left, right=right)
 
 
+@dataclasses.dataclass(frozen=True)
+class GhostLoop:
+    """Steps at which a ghost stands on an end node.
+
+    Before start those are first_ends, from start on the walk loops and they come back every
+    period steps: loop_ends are the ones in [start, start + period).
+    """
+
+    first_ends: Tuple[int, ...]
+    start: int
+    period: int
+    loop_ends: Tuple[int, ...]
+
+    def is_end(self, n_steps: int) -> bool:
+        if n_steps < self.start:
+            return n_steps in self.first_ends
+        return (n_steps - self.start) % self.period + self.start in self.loop_ends
+
+
+def merge_congruences(r1: int, m1: int, r2: int, m2: int) -> Optional[Tuple[int, int]]:
+    """Solve t = r1 (mod m1) and t = r2 (mod m2), moduli do not have to be co-prime.
+
+    :returns: (r, m) so that t = r (mod m), None if there is no solution
+    """
+    gcd = math.gcd(m1, m2)
+    if (r2 - r1) % gcd:
+        return None
+    m2_reduced = m2 // gcd
+    k = (r2 - r1) // gcd * pow(m1 // gcd, -1, m2_reduced) % m2_reduced
+    lcm = m1 * m2_reduced
+    return (r1 + m1 * k) % lcm, lcm
+
+
+@dataclasses.dataclass
+class JumpTable:
+    """Where each node leads after whole passes of the instructions.
+
+    A pass is len(instructions) steps starting at instruction 0, the state of a walk at the
+    start of a pass is therefore only a node. The tables are indexed by node id and -1
+    means the walk reached a node that was never loaded.
+    """
+
+    n_instructions: int
+    # after[k][node]: node reached after 2**k passes
+    after: List[array]
+
+    @classmethod
+    def build(cls, moves: List[array], n_nodes: int) -> Self:
+        after = array('i', [-1] * n_nodes)
+        for start in range(n_nodes):
+            current_node = start
+            for move in moves:
+                current_node = move[current_node]
+                if current_node < 0:
+                    break
+            after[start] = current_node
+
+        table = cls(len(moves), [after])
+        # the node at the start of a pass is all the state there is: 2**k >= n_nodes passes
+        # are enough to see every node we can reach
+        while (1 << (len(table.after) - 1)) < n_nodes:
+            table.add_level()
+        return table
+
+    def add_level(self):
+        after = self.after[-1]
+        self.after.append(array('i', (after[node] if node >= 0 else -1 for node in after)))
+
+    def jump(self, node: int, n_passes: int) -> int:
+        """Node reached after n_passes from node, jumping 2**k passes at a time"""
+        k = 0
+        while n_passes >> k:
+            if k == len(self.after):
+                self.add_level()
+            if n_passes >> k & 1:
+                node = self.after[k][node]
+                if node < 0:
+                    raise ValueError('Failed to load a node')
+            k += 1
+        return node
+
+
+@dataclasses.dataclass
+class PassTable:
+    """Where the end nodes are met during whole passes of the instructions, see JumpTable"""
+
+    jumps: JumpTable
+    # end_offsets[node]: steps into the pass at which we stand on an end node
+    end_offsets: List[Tuple[int, ...]]
+    # has_end[k][node]: 1 if we stand on an end node during 2**k passes from node
+    has_end: List[bytes]
+
+    @classmethod
+    def build(cls, jumps: JumpTable, moves: List[array], is_end: bytes) -> Self:
+        end_offsets = []
+        for start in range(len(is_end)):
+            current_node = start
+            offsets = []
+            for current_idx, move in enumerate(moves):
+                if is_end[current_node]:
+                    offsets.append(current_idx)
+                current_node = move[current_node]
+                if current_node < 0:
+                    break
+            end_offsets.append(tuple(offsets))
+
+        has_end = [bytes(bool(offsets) for offsets in end_offsets)]
+        for after in jumps.after[:-1]:
+            previous = has_end[-1]
+            has_end.append(bytes(previous[start] or (node >= 0 and previous[node]) for start, node in enumerate(after)))
+        return cls(jumps, end_offsets, has_end)
+
+    @property
+    def n_instructions(self) -> int:
+        return self.jumps.n_instructions
+
+    def find_loop(self, node: int) -> GhostLoop:
+        """Find where the walk from node loops and every end node it meets.
+
+        The state of a walk is (node, instruction index): it loops as soon as a node comes
+        back at the start of a pass.
+        """
+        seen: Dict[int, int] = {}
+        all_offsets = []
+        while node not in seen:
+            seen[node] = len(all_offsets)
+            all_offsets.append(self.end_offsets[node])
+            node = self.jumps.after[0][node]
+            if node < 0:
+                raise ValueError('Failed to load a node')
+
+        loop_start = seen[node]
+        all_ends = [
+            n_passes * self.n_instructions + offset
+            for n_passes, offsets in enumerate(all_offsets)
+            for offset in offsets
+        ]
+        start = loop_start * self.n_instructions
+        return GhostLoop(
+            first_ends=tuple(end for end in all_ends if end < start),
+            start=start,
+            period=(len(all_offsets) - loop_start) * self.n_instructions,
+            loop_ends=tuple(end for end in all_ends if end >= start),
+        )
+
+    def first_end(self, node: int) -> Optional[int]:
+        """Number of steps from node to the first end node, None if we never get to one"""
+        n_passes = 0
+        for k in reversed(range(len(self.has_end))):
+            if not self.has_end[k][node]:
+                node = self.jumps.after[k][node]
+                if node < 0:
+                    raise ValueError('Failed to load a node')
+                n_passes += 1 << k
+
+        if not self.end_offsets[node]:
+            return None
+        return n_passes * self.n_instructions + self.end_offsets[node][0]
+
+
+# pass table of the process pool workers, see NodeMap.follow_all
+_worker_pass_table: Optional[PassTable] = None
+
+
+def _init_worker(pass_table: PassTable):
+    global _worker_pass_table
+    _worker_pass_table = pass_table
+
+
+def _find_loop(node: int) -> GhostLoop:
+    return _worker_pass_table.find_loop(node)
+
+
 @dataclasses.dataclass
 class NodeMap:
     instructions: str
-    node_map: Dict[str, Node]
+    # node names interned to their index in those tables
+    names: List[str]
+    node_ids: Dict[str, int]
+    left: array
+    right: array
+    _pass_tables: Dict[str, PassTable] = dataclasses.field(default_factory=dict, init=False, repr=False)
 
     @classmethod
     def from_file(cls, filename: str) -> Self:
         print(f'Loading {filename}')
         instructions = None
-        nodes = {}
+        node_ids: Dict[str, int] = {}
+        loaded: List[Node] = []
         with open(filename, 'r') as fin:
             for line in fin:
                 line = line.replace('\n', '')
@@ -46,151 +228,180 @@ class NodeMap:
                     instructions = line
                 else:
                     new_node = Node.from_line(line)
-
-                    nodes[new_node.name] = new_node
-                    if new_node.left not in nodes:
-                        nodes[new_node.left] = Node(new_node.left)
-                    if new_node.right not in nodes:
-                        nodes[new_node.right] = Node(new_node.right)
-
-        print(f'  -> {len(instructions)} directions to navigate {len(nodes)} nodes')
-        return cls(instructions, nodes)
-
-    def get_left(self, node: Node) -> Node:
-        if node.left is None:
-            raise ValueError(f'Failed to load {node.name}')
-        return self.node_map[node.left]
-
-    def get_right(self, node: Node) -> Node:
-        if node.right is None:
-            raise ValueError(f'Failed to load {node.name}')
-        return self.node_map[node.right]
-
-    def follow_one(self, start: str = 'AAA', end_with: str = 'ZZZ') -> int:
-        n_iterations = 0
-        current_idx = 0
-
-        current_node = self.node_map[start]
-
-        while not current_node.name.endswith(end_with):
-            current_instruction = self.instructions[current_idx]
+                    loaded.append(new_node)
+                    for name in (new_node.name, new_node.left, new_node.right):
+                        if name not in node_ids:
+                            node_ids[name] = len(node_ids)
+
+        # -1 marks a node that was referenced but never loaded
+        left = array('i', [-1] * len(node_ids))
+        right = array('i', [-1] * len(node_ids))
+        for node in loaded:
+            node_id = node_ids[node.name]
+            left[node_id] = node_ids[node.left]
+            right[node_id] = node_ids[node.right]
+
+        print(f'  -> {len(instructions)} directions to navigate {len(node_ids)} nodes')
+        return cls(instructions, list(node_ids), node_ids, left, right)
+
+    @functools.cached_property
+    def moves(self) -> List[array]:
+        """The table to follow for each instruction"""
+        moves = []
+        for current_idx, current_instruction in enumerate(self.instructions):
             if current_instruction == 'L':
-                current_node = self.get_left(current_node)
+                moves.append(self.left)
             elif current_instruction == 'R':
-                current_node = self.get_right(current_node)
+                moves.append(self.right)
             else:
                 raise ValueError(f'Unexpected instruction {current_idx}:{current_instruction}')
+        return moves
+
+    def names_mask(self, ends_with: str) -> bytes:
+        """mask[node_id] is 1 if that node's name ends with ends_with"""
+        return bytes(name.endswith(ends_with) for name in self.names)
+
+    @functools.cached_property
+    def jump_table(self) -> JumpTable:
+        return JumpTable.build(self.moves, len(self.names))
+
+    def pass_table(self, end_with: str) -> PassTable:
+        if end_with not in self._pass_tables:
+            self._pass_tables[end_with] = PassTable.build(self.jump_table, self.moves, self.names_mask(end_with))
+        return self._pass_tables[end_with]
+
+    def walk(self, start: str, n_steps: int) -> str:
+        """Name of the node reached after n_steps from start"""
+        n_passes, n_remaining = divmod(n_steps, len(self.instructions))
+        current_node = self.jump_table.jump(self.node_ids[start], n_passes)
+        for move in self.moves[:n_remaining]:
+            previous_node = current_node
+            current_node = move[current_node]
+            if current_node < 0:
+                raise ValueError(f'Failed to load {self.names[previous_node]}')
+        return self.names[current_node]
 
-            current_idx = (current_idx + 1) % len(self.instructions)
-            n_iterations += 1
-
+    def follow_one(self, start: str = 'AAA', end_with: str = 'ZZZ') -> int:
+        n_iterations = self.pass_table(end_with).first_end(self.node_ids[start])
+        if n_iterations is None:
+            raise ValueError(f'{start} never reaches a node ending with {end_with}')
         return n_iterations
 
     def find_loops(self, start: str, end_width: str = 'Z') -> List[int]:
-        # Dict[(name, instruction idx) -> n_iteration]
-        visited: Dict[Tuple[str, int], int] = {}
+        # Dict[(node id, instruction idx) -> n_iteration]
+        visited: Dict[Tuple[int, int], int] = {}
 
         n_iterations = 0
         current_idx = 0
+        moves = self.moves
 
-        current_node = self.node_map[start]
+        current_node = self.node_ids[start]
 
         print(f'Find all loops from {start}')
         found_end = False
         rolled_over_since_end = False
 
         while not rolled_over_since_end:
-            current_visited = (current_node.name, current_idx)
+            current_visited = (current_node, current_idx)
             if current_visited in visited:
-                print(f' stopping because we are looping at {current_visited}')
+                print(f' stopping because we are looping at {(self.names[current_node], current_idx)}')
                 break
 
             visited[current_visited] = n_iterations
 
-            current_instruction = self.instructions[current_idx]
-            if current_instruction == 'L':
-                current_node = self.get_left(current_node)
-            elif current_instruction == 'R':
-                current_node = self.get_right(current_node)
-            else:
-                raise ValueError(f'Unexpected instruction {current_idx}:{current_instruction}')
+            previous_node = current_node
+            current_node = moves[current_idx][current_node]
+            if current_node < 0:
+                raise ValueError(f'Failed to load {self.names[previous_node]}')
 
-            rolled_over_since_end = found_end and current_idx == len(self.instructions) - 1
+            rolled_over_since_end = found_end and current_idx == len(moves) - 1
 
-            current_idx = (current_idx + 1) % len(self.instructions)
+            current_idx = (current_idx + 1) % len(moves)
             n_iterations += 1
 
         if rolled_over_since_end:
             print(f' aborted at {n_iterations}')
-        all_loops = [(key[0], key[1], n_ite) for key, n_ite in visited.items() if key[0].endswith(end_width)]
+        is_end = self.names_mask(end_width)
+        all_loops = [(self.names[key[0]], key[1], n_ite) for key, n_ite in visited.items() if is_end[key[0]]]
         print(f'All loops for {start}: {all_loops!r}')
         return all_loops
 
-    def follow_all_fast(self, start_ends_with: str = 'A', end_ends_with: str = 'Z') -> int:
-        start_nodes = [node for node_name, node in self.node_map.items() if node_name.endswith(start_ends_with)]
+    def follow_all_fast(self, start_ends_with: str = 'A', end_ends_with: str = 'Z', *, verbose: bool = False) -> int:
+        is_start = self.names_mask(start_ends_with)
+        start_nodes = [name for name, node_start in zip(self.names, is_start) if node_start]
         print(f'  using {len(start_nodes)} starting nodes')
 
         # assuming there is a single loop per node
-        loop_durations = [self.follow_one(current_node.name, end_with=end_ends_with) for current_node in start_nodes]
-
-        # just to print it
-        [self.find_loops(current_node.name, end_width=end_ends_with) for current_node in start_nodes]
+        loop_durations = [self.follow_one(current_node, end_with=end_ends_with) for current_node in start_nodes]
 
-        for st, first_loop in zip(start_nodes, loop_durations):
-            print(f' {st.name} loop is {first_loop}')
+        if verbose:
+            for st, first_loop in zip(start_nodes, loop_durations):
+                self.find_loops(st, end_width=end_ends_with)
+                print(f' {st} loop is {first_loop}')
 
         # I'm not convince this is a universal solution because if the loops aren't at
         # the same instruction index we could be off...
         # But this worked for my colleague's input and mine...
         return math.lcm(*loop_durations)
 
-    def follow_all(self, start_ends_with: str = 'A', end_ends_with: str = 'Z') -> int:
-        n_iterations = 0
-        current_idx = 0
-
-        current_nodes = [node for node_name, node in self.node_map.items() if node_name.endswith(start_ends_with)]
-        print(f'  using {len(current_nodes)} starting nodes')
-
-        while not all((node.name.endswith(end_ends_with) for node in current_nodes)):
-            current_instruction = self.instructions[current_idx]
-            new_current_nodes = []
-            for current_node in current_nodes:
-                if current_instruction == 'L':
-                    current_node = self.get_left(current_node)
-                elif current_instruction == 'R':
-                    current_node = self.get_right(current_node)
-                else:
-                    raise ValueError(f'Unexpected instruction {current_idx}:{current_instruction}')
-                new_current_nodes.append(current_node)
-
-            current_nodes = new_current_nodes
-            current_idx = (current_idx + 1) % len(self.instructions)
-            n_iterations += 1
+    def follow_all(self, start_ends_with: str = 'A', end_ends_with: str = 'Z', *, workers: int = 1) -> int:
+        """Number of steps until all ghosts stand on an end node at the same time
 
-            if n_iterations % 1000000 == 0:
-                print(f'  ... {n_iterations} iterations later we are still inside')
-
-        return n_iterations
+        :param workers: number of processes looking for the ghosts' loops
+        """
+        pass_table = self.pass_table(end_ends_with)
+        start_nodes = [node_id for node_id, node_start in enumerate(self.names_mask(start_ends_with)) if node_start]
+        print(f'  using {len(start_nodes)} starting nodes')
+        if not start_nodes:
+            return 0
+        if workers > 1:
+            # each worker gets the table once, only the small GhostLoop come back
+            chunk_size = math.ceil(len(start_nodes) / workers)
+            with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(pass_table,)) as executor:
+                loops = list(executor.map(_find_loop, start_nodes, chunksize=chunk_size))
+        else:
+            loops = [pass_table.find_loop(node) for node in start_nodes]
+
+        # before every ghost is looping we can only stop where the last one to loop stops
+        last_to_loop = max(loops, key=lambda loop: loop.start)
+        for n_steps in last_to_loop.first_ends:
+            if all(loop.is_end(n_steps) for loop in loops):
+                return n_steps
+
+        # after that each ghost stops at n_steps = end (mod period) for one of its loop_ends
+        congruences = {(0, 1)}
+        for loop in loops:
+            congruences = {
+                merged
+                for r, m in congruences
+                for end in loop.loop_ends
+                if (merged := merge_congruences(r, m, end % loop.period, loop.period)) is not None
+            }
+        if not congruences:
+            raise ValueError(f'Ghosts never all reach a node ending with {end_ends_with}')
+
+        return min(last_to_loop.start + (r - last_to_loop.start) % m for r, m in congruences)
 
 
 def q1(node_map: NodeMap) -> int:
     return node_map.follow_one()
 
 
-def q2(node_map: NodeMap) -> int:
-    return node_map.follow_all_fast()
+def q2(node_map: NodeMap, workers: int = 1) -> int:
+    return node_map.follow_all(workers=workers)
 
 
-def main(filename: str):
+def main(filename: str, workers: int):
     node_map = NodeMap.from_file(filename)
 
     # print(f'Q1: it took {q1(node_map)} iteration to find ZZZ')
-    print(f'Q2: it took {q2(node_map)} iteration to find *Z from *A')
+    print(f'Q2: it took {q2(node_map, workers)} iteration to find *Z from *A')
 
 
 if __name__ == '__main__':
     parser = ArgumentParser()
     parser.add_argument('--input', type=str, default='input.txt', help='Input file')
+    parser.add_argument('--workers', type=int, default=1, help='Processes used to find the ghosts loops')
     args = parser.parse_args()
 
-    main(args.input)
+    main(args.input, args.workers)
@@ -4,6 +4,7 @@ import pytest
 
 from day_08.compute import (
     NodeMap,
+    merge_congruences,
     q1,
     q2,
 )
@@ -41,6 +42,122 @@ def input_txt():
     )
 
 
+class TestNodeMap:
+    def test_from_file(self, small_ex2_txt):
+        node_map = NodeMap.from_file(small_ex2_txt)
+        assert node_map.names == ['AAA', 'BBB', 'ZZZ']
+        assert list(node_map.left) == [1, 0, 2]
+        assert list(node_map.right) == [1, 2, 2]
+        assert node_map.names_mask('Z') == bytes([0, 0, 1])
+
+    @pytest.mark.parametrize('n_steps, exp', ((0, '11A'), (1, '11B'), (2, '11Z'), (5, '11B'), (10**15, '11Z')))
+    def test_walk(self, small_ex3_txt, n_steps, exp):
+        assert NodeMap.from_file(small_ex3_txt).walk('11A', n_steps) == exp
+
+    def test_walk_input(self, input_txt):
+        node_map = NodeMap.from_file(input_txt)
+        current_node = node_map.node_ids['AAA']
+        for n_steps in range(3 * len(node_map.instructions)):
+            assert node_map.walk('AAA', n_steps) == node_map.names[current_node]
+            current_node = node_map.moves[n_steps % len(node_map.moves)][current_node]
+
+    def test_pass_tables_share_jumps(self, input_txt):
+        node_map = NodeMap.from_file(input_txt)
+        node_map.walk('AAA', 10**15)
+        assert node_map.pass_table('Z').jumps is node_map.pass_table('ZZZ').jumps is node_map.jump_table
+        assert node_map.follow_one() == node_map.follow_one(end_with='ZZZ')
+
+    def test_follow_one_never_ends(self, small_ex_txt):
+        with pytest.raises(ValueError):
+            NodeMap.from_file(small_ex_txt).follow_one('DDD')
+
+    def test_follow_all(self, small_ex3_txt):
+        assert NodeMap.from_file(small_ex3_txt).follow_all() == 6
+
+    def test_follow_all_no_start(self, small_ex3_txt):
+        assert NodeMap.from_file(small_ex3_txt).follow_all(start_ends_with='Q') == 0
+
+    @pytest.mark.parametrize(
+        'nodes, exp',
+        (
+            # 11 stops on odd steps, 22 on steps = 2 (mod 3): lcm of the first stops is wrong
+            (
+                (
+                    '11A = (11Z, 11Z)',
+                    '11Z = (11X, 11X)',
+                    '11X = (11Z, 11Z)',
+                    '22A = (22B, 22B)',
+                    '22B = (22Z, 22Z)',
+                    '22Z = (22C, 22C)',
+                    '22C = (22B, 22B)',
+                ),
+                5,
+            ),
+            # all stop before looping
+            (('11A = (11Z, 11Z)', '11Z = (11B, 11B)', '11B = (11B, 11B)', '22A = (22Z, 22Z)', '22Z = (22Z, 22Z)'), 1),
+            # loops of co-prime lengths and different starts
+            (
+                (
+                    '11A = (11B, 11B)',
+                    '11B = (11C, 11C)',
+                    '11C = (11Z, 11Z)',
+                    '11Z = (11B, 11B)',
+                    '22A = (22Z, 22Z)',
+                    '22Z = (22X, 22X)',
+                    '22X = (22Y, 22Y)',
+                    '22Y = (22W, 22W)',
+                    '22W = (22Z, 22Z)',
+                ),
+                9,
+            ),
+        ),
+    )
+    def test_follow_all_loops(self, tmp_path, nodes, exp):
+        filename = tmp_path / 'loops.txt'
+        filename.write_text('\n'.join(('L', '') + nodes))
+        node_map = NodeMap.from_file(str(filename))
+        assert node_map.follow_all() == exp
+
+        # against walking every ghost step by step
+        current_nodes = [node_id for node_id, node_start in enumerate(node_map.names_mask('A')) if node_start]
+        is_end = node_map.names_mask('Z')
+        n_steps = 0
+        while not all(is_end[node] for node in current_nodes):
+            current_nodes = [node_map.left[node] for node in current_nodes]
+            n_steps += 1
+        assert n_steps == exp
+
+    def test_follow_all_never(self, tmp_path):
+        filename = tmp_path / 'never.txt'
+        # 11 stops on odd steps, 22 on even steps
+        nodes = (
+            '11A = (11Z, 11Z)',
+            '11Z = (11B, 11B)',
+            '11B = (11Z, 11Z)',
+            '22A = (22B, 22B)',
+            '22B = (22Z, 22Z)',
+            '22Z = (22B, 22B)',
+        )
+        filename.write_text('\n'.join(('L', '') + nodes))
+        with pytest.raises(ValueError):
+            NodeMap.from_file(str(filename)).follow_all()
+
+
+@pytest.mark.parametrize(
+    'r1, m1, r2, m2, exp',
+    (
+        (2, 3, 3, 5, (8, 15)),
+        (1, 2, 2, 3, (5, 6)),
+        (2, 4, 4, 6, (10, 12)),
+        (1, 4, 2, 6, None),
+        (3, 6, 1, 2, (3, 6)),
+        (0, 1, 4, 7, (4, 7)),
+    ),
+)
+def test_merge_congruences(r1, m1, r2, m2, exp):
+    assert merge_congruences(r1, m1, r2, m2) == exp
+
+
 class TestQ1:
     def test_small_ex(self, small_ex_txt):
         assert q1(NodeMap.from_file(small_ex_txt)) == 2
@@ -58,3 +175,9 @@ class TestQ2:
 
     def test_input_txt(self, input_txt):
         assert q2(NodeMap.from_file(input_txt)) == 13830919117339
+
+    def test_input_txt_workers(self, input_txt):
+        assert q2(NodeMap.from_file(input_txt), workers=2) == 13830919117339
+
+    def test_input_txt_fast(self, input_txt):
+        assert NodeMap.from_file(input_txt).follow_all_fast() == 13830919117339
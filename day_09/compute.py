@@ -1,6 +1,10 @@
 import dataclasses
+import functools
+import math
+import operator
 from argparse import ArgumentParser
 from typing import (
+    Dict,
     Iterable,
     List,
     Self,
@@ -8,6 +12,42 @@ from typing import (
 )
 
 
+@functools.cache
+def extrapolation_weights(length: int) -> Tuple[Tuple[int, ...], Tuple[int, ...]]:
+    """Weights of each value of a sequence in its extrapolated first and last values.
+
+    Stacking the differences until they are all 0 is the same as extending the polynomial of
+    degree length - 1 going through the sequence, which gives:
+      first = sum((-1)**i * C(length, i + 1) * data[i])
+      last = sum((-1)**(length - 1 - i) * C(length, i) * data[i])
+    """
+    first = tuple((-1) ** i * math.comb(length, i + 1) for i in range(length))
+    last = tuple((-1) ** (length - 1 - i) * math.comb(length, i) for i in range(length))
+    return first, last
+
+
+def sum_extrapolations(all_data: Iterable[List[int]]) -> Tuple[int, int]:
+    """Sum of the extrapolated first values and sum of the extrapolated last values.
+
+    The extrapolations are linear so we only sum the sequences of the same length together
+    and use the weights once per length.
+    """
+    column_sums: Dict[int, List[int]] = {}
+    for data in all_data:
+        if (sums := column_sums.get(len(data))) is None:
+            column_sums[len(data)] = list(data)
+        else:
+            column_sums[len(data)] = list(map(operator.add, sums, data))
+
+    first_sum = 0
+    last_sum = 0
+    for sums in column_sums.values():
+        first, last = DataSeq._extrapolate(sums)
+        first_sum += first
+        last_sum += last
+    return first_sum, last_sum
+
+
 @dataclasses.dataclass
 class DataSeq:
     data: List[int]
@@ -15,14 +55,8 @@ class DataSeq:
     @classmethod
     def _extrapolate(cls, data: List[int]) -> Tuple[int, int]:
         """Return a new value for the beginning and the end"""
-        if all((d == 0 for d in data)):
-            return 0, 0
-
-        diff = []
-        for i in range(1, len(data)):
-            diff.append(data[i] - data[i - 1])
-        diff_etra_st, diff_extra_ed = cls._extrapolate(diff)
-        return data[0] - diff_etra_st, data[-1] + diff_extra_ed
+        first_weights, last_weights = extrapolation_weights(len(data))
+        return sum(map(operator.mul, first_weights, data)), sum(map(operator.mul, last_weights, data))
 
     @classmethod
     def from_line(cls, line: str) -> Self:
@@ -43,20 +77,20 @@ class DataSeq:
         return self
 
 
-def q1(extrapolated: List[DataSeq]) -> int:
-    return sum((d.data[-1] for d in extrapolated))
+def q1(all_data: Iterable[DataSeq]) -> int:
+    return sum_extrapolations(d.data for d in all_data)[1]
 
 
-def q2(extrapolated: List[DataSeq]) -> int:
-    # assumes q1 ran extrapolate already
-    return sum((d.data[0] for d in extrapolated))
+def q2(all_data: Iterable[DataSeq]) -> int:
+    return sum_extrapolations(d.data for d in all_data)[0]
 
 
 def main(filename: str):
-    extrapolated_data = [d.extrapolate() for d in DataSeq.from_file(filename)]
+    # one pass over the file for both answers, lines are not kept
+    first_sum, last_sum = sum_extrapolations(d.data for d in DataSeq.from_file(filename))
 
-    print(f'Q1: last entry extrapolation sum: {q1(extrapolated_data)}')
-    print(f'Q2: first entry extrapolation sum: {q2(extrapolated_data)}')
+    print(f'Q1: last entry extrapolation sum: {last_sum}')
+    print(f'Q2: first entry extrapolation sum: {first_sum}')
 
 
 if __name__ == '__main__':
@@ -4,8 +4,10 @@ import pytest
 
 from day_09.compute import (
     DataSeq,
+    extrapolation_weights,
     q1,
     q2,
+    sum_extrapolations,
 )
 
 
@@ -28,11 +30,25 @@ def input_txt():
 class TestData:
     @pytest.mark.parametrize(
         'init_data, exp_first, exp_last',
-        (([0, 0, 0, 0], 0, 0), ([3, 3, 3, 3, 3], 3, 3), ([0, 3, 6, 9, 12, 15], -3, 18)),
+        (
+            ([0, 0, 0, 0], 0, 0),
+            ([3, 3, 3, 3, 3], 3, 3),
+            ([0, 3, 6, 9, 12, 15], -3, 18),
+            ([10, 13, 16, 21, 30, 45], 5, 68),
+            ([7], 7, 7),
+            ([], 0, 0),
+        ),
     )
     def test_private_extrapolate(self, init_data, exp_first, exp_last):
         assert DataSeq._extrapolate(init_data) == (exp_first, exp_last)
 
+    def test_beyond_64_bits(self):
+        data = [2**70 * i**3 for i in range(10)]
+        assert DataSeq._extrapolate(data) == (-(2**70), 2**70 * 1000)
+
+    def test_extrapolation_weights(self):
+        assert extrapolation_weights(3) == ((3, -3, 1), (1, -3, 3))
+
     def test_extrapolate_adds_new_data(self):
         data = DataSeq.from_line('10 13 16 21 30 45')
         assert len(data.data) == 6
@@ -52,19 +68,33 @@ class TestData:
 
 class TestQ1:
     def test_small_ex(self, small_ex_txt):
-        extrapolated = [d.extrapolate() for d in DataSeq.from_file(small_ex_txt)]
-        assert q1(extrapolated) == 114
+        assert q1(DataSeq.from_file(small_ex_txt)) == 114
 
     def test_input(self, input_txt):
-        extrapolated = [d.extrapolate() for d in DataSeq.from_file(input_txt)]
-        assert q1(extrapolated) == 1731106378
+        assert q1(DataSeq.from_file(input_txt)) == 1731106378
+
+
+class TestSumExtrapolations:
+    def test_small_ex(self, small_ex_txt):
+        assert sum_extrapolations(d.data for d in DataSeq.from_file(small_ex_txt)) == (2, 114)
+
+    def test_input(self, input_txt):
+        assert sum_extrapolations(d.data for d in DataSeq.from_file(input_txt)) == (1087, 1731106378)
+
+    def test_mixed_lengths(self):
+        all_data = [[0, 3, 6, 9, 12, 15], [1, 3, 6, 10, 15], [10, 13, 16, 21, 30, 45]]
+        assert sum_extrapolations(all_data) == (-3 + 0 + 5, 18 + 21 + 68)
 
 
 class TestQ2:
     def test_small_ex(self, small_ex_txt):
-        extrapolated = [d.extrapolate() for d in DataSeq.from_file(small_ex_txt)]
-        assert q2(extrapolated) == 2
+        assert q2(DataSeq.from_file(small_ex_txt)) == 2
 
     def test_input(self, input_txt):
-        extrapolated = [d.extrapolate() for d in DataSeq.from_file(input_txt)]
-        assert q2(extrapolated) == 1087
+        assert q2(DataSeq.from_file(input_txt)) == 1087
+
+    def test_does_not_depend_on_q1(self, small_ex_txt):
+        all_data = list(DataSeq.from_file(small_ex_txt))
+        assert q2(all_data) == 2
+        assert q1(all_data) == 114
+        assert q2(all_data) == 2
@@ -1,5 +1,7 @@
 import dataclasses
+import functools
 from argparse import ArgumentParser
+from array import array
 from enum import Enum
 from typing import (
     Dict,
@@ -74,12 +76,33 @@ class Pipe:
         raise ValueError(f'Unknown {value}')
 
 
+# directions a pipe connects to, as a bit mask indexed by the pipe's byte
+_north = 1
+_south = 2
+_east = 4
+_west = 8
+_opposite = {_north: _south, _south: _north, _east: _west, _west: _east}
+_connections = bytearray(256)
+for _pipe, _mask in (
+    ('|', _north | _south),
+    ('-', _east | _west),
+    ('L', _north | _east),
+    ('J', _north | _west),
+    ('7', _south | _west),
+    ('F', _south | _east),
+):
+    _connections[ord(_pipe)] = _mask
+
+
 @dataclasses.dataclass
 class PipeMap:
     raw_data: List[str]
     start: Position
 
-    loop_map: Dict[Position, Pipe] = dataclasses.field(default_factory=dict)
+    # cells of the loop in walking order from start, as indexes in grid
+    loop: array = dataclasses.field(default_factory=lambda: array('i'))
+    # distances[i]: distance from start of loop[i]
+    distances: array = dataclasses.field(default_factory=lambda: array('i'))
 
     @classmethod
     def from_file(cls, filename: str) -> Self:
@@ -97,54 +120,139 @@ class PipeMap:
         return cls(raw_data, start)
 
     def __post_init__(self):
-        if not self.loop_map:
-            self._build_map()
-
-    def _build_from_raw(self, p: Position, distance: int) -> Optional[Pipe]:
-        if p.x < 0 or p.x >= len(self.raw_data[0]) or p.y < 0 or p.y >= len(self.raw_data):
-            return None
-
-        return Pipe.from_str(p, distance, self.raw_data[p.y][p.x])
-
-    def _build_map(self):
-        left_to_check = [self.start]
-        self.loop_map[self.start] = Pipe.from_str(self.start, 0, 'S')
+        if not self.loop:
+            self._trace_loop()
+
+    @functools.cached_property
+    def width(self) -> int:
+        """Width of grid: raw_data with a border of '.' so that we never walk out of it"""
+        return len(self.raw_data[0]) + 2
+
+    @functools.cached_property
+    def grid(self) -> bytes:
+        border = '.' * self.width
+        return ''.join((border, *(f'.{row}.' for row in self.raw_data), border)).encode()
+
+    def to_index(self, position: Position) -> int:
+        return (position.y + 1) * self.width + position.x + 1
+
+    def to_position(self, index: int) -> Position:
+        y, x = divmod(index, self.width)
+        return Position(x - 1, y - 1)
+
+    def _steps(self) -> Dict[int, int]:
+        return {_north: -self.width, _south: self.width, _east: 1, _west: -1}
+
+    def start_connections(self) -> int:
+        """Directions the start connects to, the pipes next to it have to connect back"""
+        grid = self.grid
+        start = self.to_index(self.start)
+        mask = 0
+        for direction, step in self._steps().items():
+            if _connections[grid[start + step]] & _opposite[direction]:
+                mask |= direction
+        return mask
+
+    def _trace_loop(self):
+        """Walk the loop from start: every pipe has one way in and one way out"""
         print(f'Building map from start={self.start}')
+        grid = self.grid
+        steps = self._steps()
+        start = self.to_index(self.start)
+
+        start_mask = self.start_connections()
+        if not start_mask:
+            raise ValueError(f'Nothing connects to {self.start}')
+        direction = start_mask & -start_mask  # any of them
+        current = start
+        loop = array('i')
+        while True:
+            loop.append(current)
+            current += steps[direction]
+            if current == start:
+                break
+            mask = _connections[grid[current]]
+            came_from = _opposite[direction]
+            if not mask & came_from:
+                raise ValueError(f'Loop is broken at {self.to_position(current)}')
+            direction = mask ^ came_from
+
+        n_cells = len(loop)
+        self.loop = loop
+        self.distances = array('i', (min(i, n_cells - i) for i in range(n_cells)))
+        print(f'Built map in {n_cells} iterations')
+
+    def vertices(self) -> List[Position]:
+        """Corners of the loop in walking order"""
+        vertices = []
+        n_cells = len(self.loop)
+        for i, index in enumerate(self.loop):
+            # a cell is a corner if it does not sit between its neighbours
+            before = self.loop[i - 1]
+            after = self.loop[(i + 1) % n_cells]
+            if index - before != after - index:
+                vertices.append(self.to_position(index))
+        return vertices
+
+    def enclosed_tiles(self) -> int:
+        """Number of tiles inside the loop: shoelace formula for the area then Pick's theorem.
+
+        Pick: area = inside + boundary / 2 - 1, where the boundary is every cell of the loop.
+        """
+        vertices = self.vertices()
+        double_area = 0
+        for a, b in zip(vertices, vertices[1:] + vertices[:1]):
+            double_area += a.x * b.y - b.x * a.y
+        return (abs(double_area) - len(self.loop)) // 2 + 1
+
+    def enclosed_tiles_scanline(self) -> int:
+        """Number of tiles inside the loop, scanning each row and counting crossings.
+
+        Slower than enclosed_tiles as it looks at every tile of the grid.
+        """
+        grid = self.grid
+        in_loop = bytearray(len(grid))
+        for index in self.loop:
+            in_loop[index] = 1
+        start_index = self.to_index(self.start)
+        start_mask = self.start_connections()
+
+        n_inside = 0
+        for row_start in range(self.width, len(grid) - self.width, self.width):
+            inside = False
+            for index in range(row_start, row_start + self.width):
+                if in_loop[index]:
+                    # crossing the loop is going through pipes going north: | L J
+                    mask = start_mask if index == start_index else _connections[grid[index]]
+                    if mask & _north:
+                        inside = not inside
+                elif inside:
+                    n_inside += 1
+        return n_inside
 
-        it = 0
-        while left_to_check:
-            it += 1
-            current_position = left_to_check.pop(0)
-            current = self.loop_map[current_position]
-            if it % 1000 == 0:
-                print(f'Considering {current_position} ({len(left_to_check)} other positions)')
-
-            for neighbour_position in current.get_neighbours():
-                # print(f'  checking neighbour {neighbour_position}')
-                if neighbour_position not in self.loop_map:
-                    new_pipe = self._build_from_raw(neighbour_position, current.distance + 1)
-                    if new_pipe is None:
-                        continue  # outside the edge
-                    if current_position in new_pipe.get_neighbours():
-                        left_to_check.append(neighbour_position)
-                        self.loop_map[neighbour_position] = new_pipe
-                    #    print(f'    new {neighbour_position} -> {new_pipe}')
-                    # else:
-                    #     print(f'    {neighbour_position} is not attached')
-                # else:
-                #     print(f'    known {neighbour_position} skipped')
-                # else we know about it already
-        print(f'Built map in {it} iterations')
+    @property
+    def loop_map(self) -> Dict[Position, Pipe]:
+        """Pipe of every cell in the loop"""
+        loop_map = {}
+        for index, distance in zip(self.loop, self.distances):
+            position = self.to_position(index)
+            loop_map[position] = Pipe.from_str(position, distance, chr(self.grid[index]))
+        return loop_map
 
 
 def q1(pipe_map: PipeMap) -> int:
-    return max((p.distance for p in pipe_map.loop_map.values()))
+    return max(pipe_map.distances)
+
+
+def q2(pipe_map: PipeMap) -> int:
+    return pipe_map.enclosed_tiles()
 
 
 def main(filename: str):
     pipe_map = PipeMap.from_file(filename)
 
     print(f'Q1: furthest: {q1(pipe_map)}')
+    print(f'Q2: enclosed: {q2(pipe_map)}')
 
 
 if __name__ == '__main__':
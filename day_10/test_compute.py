@@ -8,6 +8,7 @@ from day_10.compute import (
     PipeMap,
     Position,
     q1,
+    q2,
 )
 
 
@@ -27,6 +28,22 @@ def small_ex2_txt():
     )
 
 
+@pytest.fixture(scope='session')
+def small_ex3_txt():
+    return os.path.join(
+        os.path.dirname(os.path.realpath(__file__)),
+        'small_ex3.txt',
+    )
+
+
+@pytest.fixture(scope='session')
+def small_ex4_txt():
+    return os.path.join(
+        os.path.dirname(os.path.realpath(__file__)),
+        'small_ex4.txt',
+    )
+
+
 @pytest.fixture(scope='session')
 def input_txt():
     return os.path.join(
@@ -78,13 +95,58 @@ class TestPipeMap:
             )
         }
 
+    def test_trace_loop_small_ex1(self, small_ex1_txt):
+        data = PipeMap.from_file(small_ex1_txt)
+        assert [data.to_position(index) for index in data.loop] == [
+            Position(1, 1),
+            Position(1, 2),
+            Position(1, 3),
+            Position(2, 3),
+            Position(3, 3),
+            Position(3, 2),
+            Position(3, 1),
+            Position(2, 1),
+        ]
+        assert list(data.distances) == [0, 1, 2, 3, 4, 3, 2, 1]
+
+    def test_broken_loop(self):
+        with pytest.raises(ValueError):
+            PipeMap(['.....', '.S-7.', '.|..|', '.L--J'], Position(1, 1))
+
 
 class TestQ1:
     def test_small_ex1(self, small_ex1_txt):
         assert q1(PipeMap.from_file(small_ex1_txt)) == 4
 
     def test_small_ex2(self, small_ex2_txt):
-        return q1(PipeMap.from_file(small_ex2_txt)) == 8
+        assert q1(PipeMap.from_file(small_ex2_txt)) == 8
 
     def test_input(self, input_txt):
-        return q1(PipeMap.from_file(input_txt)) == 6640
+        assert q1(PipeMap.from_file(input_txt)) == 6640
+
+
+class TestQ2:
+    def test_vertices_small_ex1(self, small_ex1_txt):
+        assert PipeMap.from_file(small_ex1_txt).vertices() == [
+            Position(1, 1),
+            Position(1, 3),
+            Position(3, 3),
+            Position(3, 1),
+        ]
+
+    def test_small_ex3(self, small_ex3_txt):
+        assert q2(PipeMap.from_file(small_ex3_txt)) == 4
+
+    def test_small_ex4(self, small_ex4_txt):
+        assert q2(PipeMap.from_file(small_ex4_txt)) == 10
+
+    def test_input(self, input_txt):
+        assert q2(PipeMap.from_file(input_txt)) == 411
+
+    @pytest.mark.parametrize(
+        'filename',
+        ('small_ex1.txt', 'small_ex2.txt', 'small_ex3.txt', 'small_ex4.txt', 'input.txt'),
+    )
+    def test_scanline(self, filename):
+        pipe_map = PipeMap.from_file(os.path.join(os.path.dirname(os.path.realpath(__file__)), filename))
+        assert pipe_map.enclosed_tiles_scanline() == pipe_map.enclosed_tiles()
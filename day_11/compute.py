@@ -1,11 +1,11 @@
 import dataclasses
+import functools
 from argparse import ArgumentParser
-from collections import defaultdict
 from typing import (
     Dict,
     Iterable,
-    List,
     Self,
+    Tuple,
 )
 
 
@@ -24,7 +24,7 @@ class Position:
         return self.y < other.y
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(frozen=True)
 class GalaxyMap:
     # Position -> planet id
     universe: Dict[Position, int]
@@ -50,61 +50,24 @@ class GalaxyMap:
                     x += 1
         return cls(universe, width=width, height=height)
 
-    def _expand_vertically(self, age: int):
-        vertical_map: Dict[int, List[Position]] = defaultdict(list)
-        for position in self.universe.keys():
-            vertical_map[position.y].append(position)
-
-        for y in range(self.height, -1, -1):
-            if y in vertical_map:
-                continue  # we have a galaxy on that column
-            shifted: Dict[Position, int] = {}
-            for shift_y in list(vertical_map.keys()):
-                if shift_y > y:
-                    positions = vertical_map.pop(shift_y, [])
-                    for p in positions:
-                        galaxy = self.universe.pop(p)
-                        new_p = Position(p.x, shift_y + age)
-                        shifted[new_p] = galaxy
-
-            if shifted:
-                # keep height up to date
-                self.height += age
-                # rebuild maps for the next one
-                for position, galaxy in shifted.items():
-                    self.universe[position] = galaxy
-                    vertical_map[position.y].append(position)
-
-    def _expand_horizontally(self, age: int):
-        horizontal_map: Dict[int, List[Position]] = defaultdict(list)
-        for position in self.universe.keys():
-            horizontal_map[position.x].append(position)
-
-        for x in range(self.width, -1, -1):
-            if x in horizontal_map:
-                continue  # we have a galaxy on that row
-            shifted: Dict[Position, int] = {}
-            for shift_x in list(horizontal_map.keys()):
-                if shift_x > x:
-                    positions = horizontal_map.pop(shift_x, [])
-                    for p in positions:
-                        galaxy = self.universe.pop(p)
-                        new_p = Position(shift_x + age, p.y)
-                        shifted[new_p] = galaxy
-
-            if shifted:
-                # keep width up to date
-                self.width += age
-                # rebuild the maps for the next one
-                for position, galaxy in shifted.items():
-                    self.universe[position] = galaxy
-                    horizontal_map[position.x].append(position)
+    @functools.cached_property
+    def _empty_before(self) -> Tuple[Dict[int, int], Dict[int, int]]:
+        """For each column and each row with a galaxy: how many empty ones there are before it"""
+        columns = sorted({p.x for p in self.universe})
+        rows = sorted({p.y for p in self.universe})
+        return {x: x - i for i, x in enumerate(columns)}, {y: y - i for i, y in enumerate(rows)}
 
     def expand(self, age: int = 2) -> Self:
-        """find all empty rows and columns and make them count as double"""
-        self._expand_vertically(age - 1)
-        self._expand_horizontally(age - 1)
-        return self
+        """find all empty rows and columns and make them count as age times bigger"""
+        empty_columns, empty_rows = self._empty_before
+        return GalaxyMap(
+            {
+                Position(p.x + empty_columns[p.x] * (age - 1), p.y + empty_rows[p.y] * (age - 1)): galaxy
+                for p, galaxy in self.universe.items()
+            },
+            width=self.width + (self.width - len(empty_columns)) * (age - 1),
+            height=self.height + (self.height - len(empty_rows)) * (age - 1),
+        )
 
     def distances(self) -> Iterable[int]:
         all_positions = sorted(self.universe.keys())
@@ -113,14 +76,44 @@ class GalaxyMap:
                 next_position = all_positions[next_idx]
                 yield current.manhattan_distance(next_position)
 
+    @functools.cached_property
+    def _distance_terms(self) -> Tuple[int, int]:
+        """Sum of the distances as they are and sum of the empty rows and columns between galaxies.
+
+        Each empty row or column between two galaxies adds age - 1 to their distance, the sum
+        of the distances after expand(age) is therefore base + (age - 1) * n_empty.
+        """
+        empty_columns, empty_rows = self._empty_before
+        base = sum_pairwise_distances(p.x for p in self.universe) + sum_pairwise_distances(p.y for p in self.universe)
+        n_empty = sum_pairwise_distances(empty_columns[p.x] for p in self.universe) + sum_pairwise_distances(
+            empty_rows[p.y] for p in self.universe
+        )
+        return base, n_empty
+
+    def sum_distances(self, age: int = 1) -> int:
+        """Same as sum(self.expand(age).distances()) without expanding the map"""
+        base, n_empty = self._distance_terms
+        return base + (age - 1) * n_empty
+
+
+def sum_pairwise_distances(coordinates: Iterable[int]) -> int:
+    """Sum of |a - b| over all pairs: once sorted each value is above all the ones before it"""
+    total = 0
+    prefix_sum = 0
+    for i, c in enumerate(sorted(coordinates)):
+        total += c * i - prefix_sum
+        prefix_sum += c
+    return total
+
 
 def sum_distances(galaxy: GalaxyMap) -> int:
-    return sum(galaxy.distances())
+    return galaxy.sum_distances()
 
 
 def main(filename: str):
-    print(f'Q1: sum of distances is {sum_distances(GalaxyMap.from_file(filename).expand(2))}')
-    print(f'Q2: sum of distances is {sum_distances(GalaxyMap.from_file(filename).expand(1000000))}')
+    galaxy_map = GalaxyMap.from_file(filename)
+    print(f'Q1: sum of distances is {galaxy_map.sum_distances(2)}')
+    print(f'Q2: sum of distances is {galaxy_map.sum_distances(1000000)}')
 
 
 if __name__ == '__main__':
@@ -62,6 +62,21 @@ class TestGalaxyMap:
             key=itemgetter(1),
         )
 
+    def test_sum_distances(self, small_ex_txt):
+        data = GalaxyMap.from_file(small_ex_txt).expand(2)
+        assert data.sum_distances() == sum(data.distances()) == 374
+
+    def test_expand_does_not_change_map(self, small_ex_txt):
+        data = GalaxyMap.from_file(small_ex_txt)
+        data.expand(2)
+        assert data == GalaxyMap.from_file(small_ex_txt)
+
+    @pytest.mark.parametrize('age, exp', ((1, 292), (2, 374), (10, 1030), (100, 8410), (1000000, 82000210)))
+    def test_sum_distances_age(self, small_ex_txt, age, exp):
+        data = GalaxyMap.from_file(small_ex_txt)
+        assert data.sum_distances(age) == exp
+        assert sum(data.expand(age).distances()) == exp
+
     def test_expand_10(self, small_ex_txt):
         data = GalaxyMap.from_file(small_ex_txt).expand(10)
         assert sum_distances(data) == 1030
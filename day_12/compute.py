@@ -1,14 +1,71 @@
 import dataclasses
+import functools
 from argparse import ArgumentParser
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from copy import copy
 from typing import (
     ClassVar,
+    Dict,
     List,
     Optional,
     Self,
+    Tuple,
 )
 
 
+@dataclasses.dataclass
+class SpringMachine:
+    """State machine matching the rows of a checksum, e.g. 1,3 is '.#.###.'.
+
+    Each '#' state has to be followed by the next state, '.' states can also loop on
+    themselves. Counting how many ways each state is reached while reading a row gives the
+    number of arrangements.
+    """
+
+    # next state reading an operational or a broken spring, -1 when the row cannot match
+    on_operational: List[int]
+    on_broken: List[int]
+    accepting: Tuple[int, ...]
+
+    @classmethod
+    def from_checksum(cls, checksum: Tuple[int, ...]) -> Self:
+        pattern = '.' + '.'.join(SpringRow.Broken * group for group in checksum) + '.'
+        on_operational = []
+        on_broken = []
+        for state, current in enumerate(pattern):
+            following = pattern[state + 1] if state + 1 < len(pattern) else None
+            if current == SpringRow.Operational:
+                on_operational.append(state)
+            else:
+                on_operational.append(state + 1 if following == SpringRow.Operational else -1)
+            on_broken.append(state + 1 if following == SpringRow.Broken else -1)
+
+        accepting = (len(pattern) - 1, len(pattern) - 2) if checksum else (0,)
+        return cls(on_operational, on_broken, accepting)
+
+    def count(self, map_data: List[Optional[bool]]) -> int:
+        # ways to reach each state after reading the springs so far
+        counts = [0] * len(self.on_operational)
+        counts[0] = 1
+        for spring in map_data:
+            next_counts = [0] * len(counts)
+            for state, n_ways in enumerate(counts):
+                if not n_ways:
+                    continue
+                if spring is not False and (next_state := self.on_operational[state]) >= 0:
+                    next_counts[next_state] += n_ways
+                if spring is not True and (next_state := self.on_broken[state]) >= 0:
+                    next_counts[next_state] += n_ways
+            counts = next_counts
+        return sum(counts[state] for state in self.accepting)
+
+
+@functools.lru_cache(maxsize=4096)
+def compile_checksum(checksum: Tuple[int, ...]) -> SpringMachine:
+    return SpringMachine.from_checksum(checksum)
+
+
 @dataclasses.dataclass
 class SpringRow:
     Operational: ClassVar[str] = '.'
@@ -67,8 +124,8 @@ class SpringRow:
 
         return results
 
-    def fill_gaps(self) -> int:
-        """Return number of combinations that fill the gaps"""
+    def brute_fill_gaps(self) -> int:
+        """Return number of combinations that fill the gaps, trying all of them"""
         if self.n_unknown == 0:
             return 0
 
@@ -88,6 +145,54 @@ class SpringRow:
         print(f'Generated {count}/{count + failed} combinations')
         return count
 
+    def count_arrangements(self) -> int:
+        """Number of ways to fill the unknowns that match the checksum"""
+        checksum = self.checksum
+        # (groups done, broken in a row) -> arrangements of the springs read so far
+        states: Dict[Tuple[int, int], int] = {(0, 0): 1}
+        for spring in self.map_data:
+            next_states: Dict[Tuple[int, int], int] = defaultdict(int)
+            for (group, run), n in states.items():
+                if spring is not False:
+                    # operational: ends the current run, if any
+                    if run == 0:
+                        next_states[group, 0] += n
+                    elif run == checksum[group]:
+                        next_states[group + 1, 0] += n
+                # broken: extends the current run, as long as the group allows it
+                if spring is not True and group < len(checksum) and run < checksum[group]:
+                    next_states[group, run + 1] += n
+            states = next_states
+
+        # the last run may end with the row
+        return sum(
+            n
+            for (group, run), n in states.items()
+            if group == len(checksum) or (group == len(checksum) - 1 and run == checksum[group])
+        )
+
+    def count_with_machine(self) -> int:
+        """Same as count_arrangements using the state machine of the checksum"""
+        return compile_checksum(tuple(self.checksum)).count(self.map_data)
+
+    def fill_gaps(self) -> int:
+        """Return number of combinations that fill the gaps"""
+        if self.n_unknown == 0:
+            return 0
+        return self.count_arrangements()
+
+    def unfold(self, n: int = 5) -> Self:
+        """Repeat the row n times, separated by an unknown, and the checksum n times"""
+        map_data = list(self.map_data)
+        for _ in range(n - 1):
+            map_data.append(None)
+            map_data.extend(self.map_data)
+        return SpringRow(
+            map_data=map_data,
+            n_unknown=self.n_unknown * n + n - 1,
+            checksum=self.checksum * n,
+        )
+
     @classmethod
     def build_checksum(cls, map_data: List[bool]) -> List[int]:
         checksum = []
@@ -142,19 +247,34 @@ class SpringRow:
         return data
 
 
-def q1(data: List[SpringRow]) -> int:
+def count_all(data: List[SpringRow], workers: int = 1) -> int:
+    """Sum of fill_gaps for all rows, rows are independent so they can be split across processes"""
+    if workers > 1:
+        chunk_size = max(1, len(data) // (workers * 4))
+        with ProcessPoolExecutor(workers) as executor:
+            return sum(executor.map(SpringRow.fill_gaps, data, chunksize=chunk_size))
     return sum((spring.fill_gaps() for spring in data))
 
 
-def main(filename: str):
+def q1(data: List[SpringRow], workers: int = 1) -> int:
+    return count_all(data, workers)
+
+
+def q2(data: List[SpringRow], workers: int = 1) -> int:
+    return count_all([spring.unfold(5) for spring in data], workers)
+
+
+def main(filename: str, workers: int):
     data = SpringRow.from_file(filename)
 
-    print(f'Q1: found {q1(data)}')
+    print(f'Q1: found {q1(data, workers)}')
+    print(f'Q2: found {q2(data, workers)}')
 
 
 if __name__ == '__main__':
     parser = ArgumentParser()
     parser.add_argument('--input', type=str, default='input.txt', help='Input file')
+    parser.add_argument('--workers', type=int, default=1, help='Processes used to count the arrangements')
     args = parser.parse_args()
 
-    main(args.input)
+    main(args.input, args.workers)
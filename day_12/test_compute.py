@@ -4,7 +4,9 @@ import pytest
 
 from day_12.compute import (
     SpringRow,
+    compile_checksum,
     q1,
+    q2,
 )
 
 
@@ -62,6 +64,61 @@ class TestSpringRow:
     def test_fill_gaps(self, line, expected):
         spring_row = SpringRow.from_line(line)
         assert spring_row.fill_gaps() == expected
+        assert spring_row.brute_fill_gaps() == expected
+
+    def test_count_arrangements_small_ex(self, small_ex_txt):
+        for spring_row in SpringRow.from_file(small_ex_txt):
+            assert spring_row.count_arrangements() == spring_row.brute_fill_gaps()
+
+    @pytest.mark.parametrize(
+        'line, expected',
+        (
+            ('#.# 1,1', 1),
+            ('### 1,1', 0),
+            ('??? 4', 0),
+            ('.?. 1', 1),
+        ),
+    )
+    def test_count_arrangements(self, line, expected):
+        spring_row = SpringRow.from_line(line)
+        assert spring_row.count_arrangements() == expected
+        assert spring_row.count_with_machine() == expected
+
+    def test_count_arrangements_long_row(self):
+        spring_row = SpringRow.from_line('?' * 1200 + ' 1,1')
+        assert spring_row.count_arrangements() == spring_row.count_with_machine() == 718201
+
+    def test_count_with_machine(self, small_ex_txt):
+        for spring_row in SpringRow.from_file(small_ex_txt):
+            assert spring_row.count_with_machine() == spring_row.count_arrangements()
+            unfolded = spring_row.unfold(5)
+            assert unfolded.count_with_machine() == unfolded.count_arrangements()
+
+    def test_compile_checksum(self):
+        machine = compile_checksum((1, 2))
+        # .#.##.
+        assert machine.on_operational == [0, 2, 2, -1, 5, 5]
+        assert machine.on_broken == [1, -1, 3, 4, -1, -1]
+        assert machine.accepting == (5, 4)
+        assert compile_checksum((1, 2)) is machine
+
+    def test_unfold(self):
+        spring_row = SpringRow.from_line('.# 1').unfold(5)
+        assert spring_row == SpringRow.from_line('.#?.#?.#?.#?.# 1,1,1,1,1')
+
+    @pytest.mark.parametrize(
+        'line, expected',
+        (
+            ('???.### 1,1,3', 1),
+            ('.??..??...?##. 1,1,3', 16384),
+            ('?#?#?#?#?#?#?#? 1,3,1,6', 1),
+            ('????.#...#... 4,1,1', 16),
+            ('????.######..#####. 1,6,5', 2500),
+            ('?###???????? 3,2,1', 506250),
+        ),
+    )
+    def test_fill_gaps_unfolded(self, line, expected):
+        assert SpringRow.from_line(line).unfold(5).fill_gaps() == expected
 
 
 class TestQ1:
@@ -70,3 +127,14 @@ class TestQ1:
 
     def test_input(self, input_txt):
         assert q1(SpringRow.from_file(input_txt)) == 7350
+
+
+class TestQ2:
+    def test_small_ex(self, small_ex_txt):
+        assert q2(SpringRow.from_file(small_ex_txt)) == 525152
+
+    def test_input(self, input_txt):
+        assert q2(SpringRow.from_file(input_txt)) == 200097286528151
+
+    def test_input_workers(self, input_txt):
+        assert q2(SpringRow.from_file(input_txt), workers=2) == 200097286528151
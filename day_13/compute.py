@@ -1,9 +1,15 @@
 import dataclasses
 import functools
+import itertools
 from argparse import ArgumentParser
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from typing import (
+    Iterable,
+    Iterator,
     List,
     Self,
+    Tuple,
 )
 
 
@@ -43,14 +49,6 @@ class Position:
         )
 
 
-@functools.cache
-def string_to_binary(value: str) -> int:
-    st = 0
-    for power, character in enumerate(reversed(value)):
-        st += int(character == '#') << power
-    return st
-
-
 @dataclasses.dataclass(frozen=True)
 class Pattern:
     data: List[str]
@@ -63,93 +61,153 @@ class Pattern:
     def height(self) -> int:
         return len(self.data)
 
+    @functools.cached_property
+    def _numbers(self) -> Tuple[List[int], List[int]]:
+        """Rows and columns as binary numbers, '#' is 1, built in one pass over the pattern"""
+        rows = []
+        cols = [0] * self.width
+        for y, line in enumerate(self.data):
+            row = 0
+            for x, character in enumerate(line):
+                if character == '#':
+                    row |= 1 << (self.width - 1 - x)
+                    cols[x] |= 1 << y
+            rows.append(row)
+        return rows, cols
+
     def get_row_numbers(self) -> List[int]:
-        results = []
-        for y in range(0, self.height):
-            results.append(string_to_binary(self.data[y]))
-        return results
+        return self._numbers[0]
 
     def get_col_numbers(self) -> List[int]:
-        results = []
-        for x in range(0, self.width):
-            values = ''
-            for y in range(self.height - 1, -1, -1):
-                values += self.data[y][x]
-
-            results.append(string_to_binary(values))
-        return results
+        return self._numbers[1]
 
     @classmethod
-    def from_file(cls, filename: str) -> List[Self]:
-        result = []
-        print(f'Loading {filename}')
+    def iter_file(cls, filename: str) -> Iterator[Self]:
+        """Yield the patterns one at a time, they are separated by blank lines"""
         with open(filename, 'r') as fin:
             data = []
             for line in fin:
                 line = line.replace('\n', '')
                 if not line:
-                    result.append(
-                        cls(
-                            data=data,
-                        ),
-                    )
+                    if data:
+                        yield cls(data=data)
                     data = []
                 else:
                     data.append(line)
 
             # end of file reached
             if data:
-                result.append(
-                    cls(
-                        data=data,
-                    ),
-                )
+                yield cls(data=data)
+
+    @classmethod
+    def from_file(cls, filename: str) -> List[Self]:
+        print(f'Loading {filename}')
+        result = list(cls.iter_file(filename))
         print(f'  -> loaded {len(result)} patterns')
         return result
 
     @classmethod
-    def _find_symetry(self, values: List[int], start: int) -> bool:
+    def _find_symetry(cls, values: List[int], start: int, n_smudges: int = 0) -> bool:
+        """True if mirroring after values[start] differs by exactly n_smudges bits"""
         i = start
         j = start + 1
-        match = True
-        while i >= 0 and j < len(values) and match:
-            match = values[i] == values[j]
+        n_differences = 0
+        while i >= 0 and j < len(values) and n_differences <= n_smudges:
+            n_differences += (values[i] ^ values[j]).bit_count()
             i -= 1
             j += 1
-        return match
+        return n_differences == n_smudges
 
-    def find_mirror(self) -> Position:
+    def find_mirror(self, n_smudges: int = 0) -> Position:
+        """Find the mirror for which exactly n_smudges cells are not reflected"""
         rows = self.get_row_numbers()
         for y in range(0, len(rows) - 1):
-            if self._find_symetry(rows, y):
+            if self._find_symetry(rows, y, n_smudges):
                 return Position(None, y)
 
         cols = self.get_col_numbers()
         for x in range(0, len(cols) - 1):
-            if self._find_symetry(cols, x):
+            if self._find_symetry(cols, x, n_smudges):
                 return Position(x, None)
 
         return None
 
 
-def q1(data: List[Pattern]) -> int:
+def find_mirrors(patterns: List[Pattern], n_smudges: int) -> List[Position]:
+    return [pattern.find_mirror(n_smudges) for pattern in patterns]
+
+
+def _chunks(patterns: Iterable[Pattern], chunk_size: int) -> Iterator[List[Pattern]]:
+    patterns = iter(patterns)
+    while chunk := list(itertools.islice(patterns, chunk_size)):
+        yield chunk
+
+
+def _pooled_find_mirrors(
+    chunks: Iterator[List[Pattern]],
+    n_smudges: int,
+    workers: int,
+) -> Iterator[List[Position]]:
+    """find_mirrors of each chunk, in order, with at most 2 chunks per worker waiting"""
+    with ProcessPoolExecutor(workers) as executor:
+        in_flight = deque()
+        for chunk in chunks:
+            in_flight.append(executor.submit(find_mirrors, chunk, n_smudges))
+            if len(in_flight) >= 2 * workers:
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
+
+
+def score_all(
+    patterns: Iterable[Pattern],
+    n_smudges: int = 0,
+    *,
+    workers: int = 1,
+    chunk_size: int = 1000,
+    verbose: bool = False,
+) -> int:
+    """Sum the scores of all patterns, reading them as they come.
+
+    With more than 1 worker the chunks of patterns are scored in a process pool.
+    """
+    chunks = _chunks(patterns, chunk_size)
+    if workers > 1:
+        all_mirrors = _pooled_find_mirrors(chunks, n_smudges, workers)
+    else:
+        all_mirrors = (find_mirrors(chunk, n_smudges) for chunk in chunks)
+
     scores = 0
-    for i, pat in enumerate(data):
-        m = pat.find_mirror()
-        print(f'Found {i}: {m}')
-        scores += m.score
+    i = 0
+    for mirrors in all_mirrors:
+        for m in mirrors:
+            if verbose:
+                print(f'Found {i}: {m}')
+            scores += m.score
+            i += 1
     return scores
 
 
-def main(filename: str):
-    data = Pattern.from_file(filename)
+def q1(data: Iterable[Pattern], n_smudges: int = 0, *, workers: int = 1, verbose: bool = False) -> int:
+    return score_all(data, n_smudges, workers=workers, verbose=verbose)
+
+
+def q2(data: Iterable[Pattern], *, workers: int = 1, verbose: bool = False) -> int:
+    return q1(data, n_smudges=1, workers=workers, verbose=verbose)
+
+
+def main(filename: str, workers: int, verbose: bool):
+    print(f'Loading {filename}')
 
-    print(f'Q1: {q1(data)}')
+    print(f'Q1: {q1(Pattern.iter_file(filename), workers=workers, verbose=verbose)}')
+    print(f'Q2: {q2(Pattern.iter_file(filename), workers=workers, verbose=verbose)}')
 
 
 if __name__ == '__main__':
     parser = ArgumentParser()
     parser.add_argument('--input', type=str, default='input.txt', help='Input file')
+    parser.add_argument('--workers', type=int, default=1, help='Processes used to score the patterns')
+    parser.add_argument('--verbose', action='store_true', help='Print the mirror of each pattern')
     args = parser.parse_args()
 
-    main(args.input)
+    main(args.input, args.workers, args.verbose)
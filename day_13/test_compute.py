@@ -6,6 +6,8 @@ from day_13.compute import (
     Pattern,
     Position,
     q1,
+    q2,
+    score_all,
 )
 
 
@@ -111,6 +113,23 @@ class TestPattern:
         pattern = Pattern.from_file(small_ex_txt)[idx]
         assert pattern.find_mirror() == exp_mirror
 
+    def test_numbers(self, small_ex_txt):
+        pattern = Pattern.from_file(small_ex_txt)[0]
+        # '#' is 1, rows are read left to right and columns bottom to top
+        assert pattern.get_row_numbers() == [358, 90, 385, 385, 90, 102, 346]
+        assert pattern.get_col_numbers() == [77, 12, 115, 33, 82, 82, 33, 115, 12]
+
+    @pytest.mark.parametrize(
+        'idx, exp_mirror',
+        (
+            (0, Position(None, 2)),
+            (1, Position(None, 0)),
+        ),
+    )
+    def test_find_smudged_mirror_small_ex(self, small_ex_txt, idx, exp_mirror):
+        pattern = Pattern.from_file(small_ex_txt)[idx]
+        assert pattern.find_mirror(n_smudges=1) == exp_mirror
+
     @pytest.mark.parametrize(
         'idx, exp_mirror',
         (
@@ -130,3 +149,24 @@ class TestQ1:
 
     def test_input(self, input_txt):
         assert q1(Pattern.from_file(input_txt)) == 28895
+
+
+class TestQ2:
+    def test_small_ex(self, small_ex_txt):
+        assert q2(Pattern.from_file(small_ex_txt)) == 400
+
+    def test_input(self, input_txt):
+        assert q2(Pattern.from_file(input_txt)) == 31603
+
+
+class TestScoreAll:
+    def test_iter_file(self, input_txt):
+        assert list(Pattern.iter_file(input_txt)) == Pattern.from_file(input_txt)
+
+    @pytest.mark.parametrize('n_smudges, exp', ((0, 28895), (1, 31603)))
+    def test_workers(self, input_txt, n_smudges, exp):
+        assert score_all(Pattern.iter_file(input_txt), n_smudges, workers=2, chunk_size=7) == exp
+
+    def test_verbose(self, small_ex_txt, capsys):
+        assert score_all(Pattern.iter_file(small_ex_txt), verbose=True) == 405
+        assert capsys.readouterr().out == 'Found 0: Position(x=4, y=None)\nFound 1: Position(x=None, y=3)\n'
@@ -1,11 +1,14 @@
+import abc
 import dataclasses
+import functools
 from argparse import ArgumentParser
-from collections import defaultdict
 from enum import Enum
 from typing import (
     Dict,
     Iterable,
+    List,
     Self,
+    Tuple,
 )
 
 
@@ -36,9 +39,57 @@ class Position:
         return 0 <= self.x < width and 0 <= self.y < height
 
 
+_boulder = ord(Obstacle.Boulder.value)
+_rock = ord(Obstacle.Rock.value)
+_ground = ord(Obstacle.Ground.value)
+# boulders (or rocks) to '1', anything else to '0'
+_boulder_bits = bytes(ord('1') if cell == _boulder else ord('0') for cell in range(256))
+_rock_bits = bytes(ord('1') if cell == _rock else ord('0') for cell in range(256))
+
+North = Position(0, -1)
+South = Position(0, 1)
+East = Position(1, 0)
+West = Position(-1, 0)
+
+
+class SpinningPlatform(metaclass=abc.ABCMeta):
+    """Spin cycles for platforms that can tilt and give a fingerprint of their boulders"""
+
+    @abc.abstractmethod
+    def tilt(self, direction: Position) -> Self:
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    def fingerprint(self) -> int:
+        raise NotImplementedError()
+
+    def spin_cycle(self) -> Self:
+        for direction in (North, West, South, East):
+            self.tilt(direction)
+        return self
+
+    def spin(self, n_cycles: int) -> Self:
+        """Run n_cycles spin cycles, skip ahead once the platform is back to a previous state"""
+        seen: Dict[int, int] = {}
+        cycle = 0
+        while cycle < n_cycles:
+            fingerprint = self.fingerprint()
+            if fingerprint in seen:
+                loop_size = cycle - seen[fingerprint]
+                print(f'  cycle {cycle} is the same as cycle {seen[fingerprint]}')
+                for _ in range((n_cycles - cycle) % loop_size):
+                    self.spin_cycle()
+                return self
+            seen[fingerprint] = cycle
+            self.spin_cycle()
+            cycle += 1
+        return self
+
+
 @dataclasses.dataclass
-class Platform:
-    objects: Dict[Position, Obstacle]
+class Platform(SpinningPlatform):
+    # one byte per cell in raster order: the Obstacle values
+    grid: bytearray
     width: int
     height: int
 
@@ -46,61 +97,220 @@ class Platform:
     def from_file(cls, filename: str) -> Self:
         print(f'Loading {filename}')
         with open(filename, 'r') as fin:
-            objects = {}
-            y = 0
+            grid = bytearray()
+            height = 0
             width = 0
-            for y, line in enumerate(fin):
+            for line in fin:
                 line = line.replace('\n', '')
-                x = 0
-                for x, char in enumerate(line):
-                    obstacle = Obstacle(char)
-                    if obstacle != Obstacle.Ground:
-                        objects[Position(x, y)] = obstacle
-                width = x + 1
-            height = y + 1
-
-            return cls(objects, width, height)
-
-    def last_free_space(self, current: Position, direction: Position) -> Position:
-        next_position = current + direction
-        while next_position.within(self.width, self.height) and next_position not in self.objects:
-            current += direction
-            next_position += direction
-        return current
-
-    def _boulders(self) -> Iterable[Position]:
-        for position, obstacle in self.objects.items():
-            if obstacle == Obstacle.Boulder:
-                yield position
+                if not line:
+                    continue
+                for char in set(line):
+                    Obstacle(char)  # validate
+                grid.extend(line.encode())
+                width = len(line)
+                height += 1
 
-    def tilt_north(self) -> Self:
-        vector = Position(0, -1)
+            return cls(grid, width, height)
 
-        # in raster order, so let's just move them
-        for boulder in sorted(self._boulders()):
-            next_position = self.last_free_space(boulder, vector)
-            if next_position != boulder:
-                self.objects[next_position] = self.objects.pop(boulder)
+    @property
+    def objects(self) -> Dict[Position, Obstacle]:
+        """Every boulder and rock"""
+        return {
+            Position(index % self.width, index // self.width): Obstacle(chr(cell))
+            for index, cell in enumerate(self.grid)
+            if cell != _ground
+        }
 
+    def to_lines(self) -> List[str]:
+        return [self.grid[y * self.width : (y + 1) * self.width].decode() for y in range(self.height)]
+
+    def _lines(self, direction: Position) -> Tuple[Iterable[int], int, int]:
+        """Start of each line on the side we tilt towards, step along a line and its length"""
+        if direction == North:
+            return range(self.width), self.width, self.height
+        elif direction == South:
+            return range((self.height - 1) * self.width, self.height * self.width), -self.width, self.height
+        elif direction == West:
+            return range(0, self.height * self.width, self.width), 1, self.width
+        elif direction == East:
+            return range(self.width - 1, self.height * self.width, self.width), -1, self.width
+        raise ValueError(f'Unexpected {direction}')
+
+    def tilt(self, direction: Position) -> Self:
+        """Roll the boulders towards direction, one line at a time.
+
+        Walking a line from the side we tilt to, each boulder drops on the cell after the last
+        rock or boulder seen.
+        """
+        grid = self.grid
+        starts, step, length = self._lines(direction)
+        for start in starts:
+            free = start
+            index = start
+            for _ in range(length):
+                cell = grid[index]
+                if cell == _rock:
+                    free = index + step
+                elif cell == _boulder:
+                    if index != free:
+                        grid[free] = _boulder
+                        grid[index] = _ground
+                    free += step
+                index += step
         return self
 
+    def tilt_north(self) -> Self:
+        return self.tilt(North)
+
+    def fingerprint(self) -> int:
+        """Where the boulders are, one bit per cell"""
+        return int(self.grid.translate(_boulder_bits), 2)
+
     def north_load(self) -> int:
-        by_row: Dict[int, int] = defaultdict(int)
+        return sum(
+            (self.height - y) * self.grid.count(_boulder, y * self.width, (y + 1) * self.width)
+            for y in range(self.height)
+        )
+
+
+@dataclasses.dataclass
+class BitPlatform(SpinningPlatform):
+    """Same as Platform with the boulders of each row, or of each column, as an int.
+
+    Bit x of a row and bit y of a column is the cell (x, y). North and south tilts work on the
+    columns, east and west on the rows, the boulders are transposed when that changes. Rocks
+    never move so the gaps between them are found once: a tilt packs each gap's popcount of
+    boulders at one of its ends.
+    """
+
+    # rows or columns, see by_column
+    boulders: List[int]
+    # rows
+    rocks: List[int]
+    width: int
+    height: int
+    by_column: bool = False
+
+    @classmethod
+    def from_platform(cls, platform: Platform) -> Self:
+        boulders = []
+        rocks = []
+        for y in range(platform.height):
+            row = platform.grid[y * platform.width : (y + 1) * platform.width]
+            boulders.append(int(row.translate(_boulder_bits)[::-1], 2))
+            rocks.append(int(row.translate(_rock_bits)[::-1], 2))
+        return cls(boulders, rocks, platform.width, platform.height)
+
+    @classmethod
+    def from_file(cls, filename: str) -> Self:
+        return cls.from_platform(Platform.from_file(filename))
+
+    @classmethod
+    def _transpose(cls, lines: List[int], length: int) -> List[int]:
+        """Lines of length bits to length lines of len(lines) bits"""
+        # bits are read from the highest, so the last line comes first and the last bit last
+        bits = [format(line, f'0{length}b') for line in reversed(lines)]
+        return [int(''.join(bit_line), 2) for bit_line in zip(*bits)][::-1]
+
+    @classmethod
+    def _gaps(cls, rocks: List[int], length: int) -> List[List[Tuple[int, int, int]]]:
+        """(mask, first bit, bit after the last) of each run of cells without rocks, per line"""
+        all_gaps = []
+        for line in rocks:
+            gaps = []
+            start = 0
+            for gap in format(line, f'0{length}b')[::-1].split('1'):
+                if gap:
+                    gaps.append((((1 << len(gap)) - 1) << start, 1 << start, 1 << (start + len(gap))))
+                start += len(gap) + 1
+            all_gaps.append(gaps)
+        return all_gaps
+
+    @functools.cached_property
+    def _row_gaps(self) -> List[List[Tuple[int, int, int]]]:
+        return self._gaps(self.rocks, self.width)
 
-        for boulder in self._boulders():
-            by_row[boulder.y] += 1
+    @functools.cached_property
+    def _column_gaps(self) -> List[List[Tuple[int, int, int]]]:
+        return self._gaps(self._transpose(self.rocks, self.width), self.height)
 
-        return sum(((self.width - y) * n for y, n in by_row.items()))
+    def _lines(self, by_column: bool) -> List[int]:
+        """The boulders by rows or by columns, transposing them if needed"""
+        if by_column != self.by_column:
+            if by_column:
+                self.boulders = self._transpose(self.boulders, self.width)
+            else:
+                self.boulders = self._transpose(self.boulders, self.height)
+            self.by_column = by_column
+        return self.boulders
+
+    def to_platform(self) -> Platform:
+        rows = self._lines(by_column=False)
+        grid = bytearray()
+        for boulders, rocks in zip(rows, self.rocks):
+            for x in range(self.width):
+                if boulders >> x & 1:
+                    grid.append(_boulder)
+                elif rocks >> x & 1:
+                    grid.append(_rock)
+                else:
+                    grid.append(_ground)
+        return Platform(grid, self.width, self.height)
+
+    def to_lines(self) -> List[str]:
+        return self.to_platform().to_lines()
+
+    def tilt(self, direction: Position) -> Self:
+        """Pack the boulders of each gap between rocks at the end of the gap we tilt towards"""
+        if direction in (North, South):
+            lines = self._lines(by_column=True)
+            all_gaps = self._column_gaps
+        elif direction in (West, East):
+            lines = self._lines(by_column=False)
+            all_gaps = self._row_gaps
+        else:
+            raise ValueError(f'Unexpected {direction}')
+
+        to_start = direction in (North, West)
+        for index, (line, gaps) in enumerate(zip(lines, all_gaps)):
+            if not line:
+                continue
+            new_line = 0
+            if to_start:
+                for mask, first_bit, _ in gaps:
+                    new_line |= (first_bit << (line & mask).bit_count()) - first_bit
+            else:
+                for mask, _, end_bit in gaps:
+                    new_line |= end_bit - (end_bit >> (line & mask).bit_count())
+            lines[index] = new_line
+        return self
+
+    def tilt_north(self) -> Self:
+        return self.tilt(North)
+
+    def fingerprint(self) -> int:
+        """Where the boulders are, one bit per cell"""
+        n_bytes = (self.width + 7) // 8
+        rows = self._lines(by_column=False)
+        return int.from_bytes(b''.join(row.to_bytes(n_bytes, 'little') for row in rows), 'little')
+
+    def north_load(self) -> int:
+        return sum((self.height - y) * row.bit_count() for y, row in enumerate(self._lines(by_column=False)))
 
 
 def q1(data: Platform) -> int:
     return data.tilt_north().north_load()
 
 
+def q2(data: Platform) -> int:
+    return data.spin(1000000000).north_load()
+
+
 def main(filename: str):
     data = Platform.from_file(filename)
 
-    print(f'Q1: load on north: {q1(data)}')
+    print(f'Q1: load on north: {q1(dataclasses.replace(data, grid=bytearray(data.grid)))}')
+    print(f'Q2: load on north: {q2(BitPlatform.from_platform(data))}')
 
 
 if __name__ == '__main__':
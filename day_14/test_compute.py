@@ -1,10 +1,18 @@
 import os
+import random
 
 import pytest
 
 from day_14.compute import (
+    BitPlatform,
+    East,
+    North,
     Platform,
+    South,
+    SpinningPlatform,
+    West,
     q1,
+    q2,
 )
 
 
@@ -24,9 +32,146 @@ def input_txt():
     )
 
 
+@pytest.fixture()
+def sparse_platform():
+    # 1000 rows, the first column has no rocks and one boulder at the bottom
+    random.seed(14)
+    width, height = 20, 1000
+    grid = bytearray(random.choices(b'O#.', weights=(5, 1, 94), k=width * height))
+    for y in range(height):
+        grid[y * width] = ord('.')
+    grid[(height - 1) * width] = ord('O')
+    return Platform(grid, width, height)
+
+
+class TestPlatform:
+    def test_tilt_north(self, small_ex_txt):
+        assert Platform.from_file(small_ex_txt).tilt_north().to_lines() == [
+            'OOOO.#.O..',
+            'OO..#....#',
+            'OO..O##..O',
+            'O..#.OO...',
+            '........#.',
+            '..#....#.#',
+            '..O..#.O.O',
+            '..O.......',
+            '#....###..',
+            '#....#....',
+        ]
+
+    @pytest.mark.parametrize(
+        'direction, exp',
+        (
+            (North, ['O#O', 'O..', '.#.', '.O.']),
+            (South, ['.#.', '...', 'O#.', 'OOO']),
+            (West, ['.#O', 'O..', 'O#.', 'O..']),
+            (East, ['.#O', '..O', 'O#.', '..O']),
+        ),
+    )
+    def test_tilt(self, direction, exp):
+        # .#O
+        # O..
+        # O#.
+        # .O.
+        platform = Platform(bytearray(b'.#OO..O#..O.'), width=3, height=4)
+        assert platform.tilt(direction).to_lines() == exp
+
+    def test_spin_cycle(self, small_ex_txt):
+        platform = Platform.from_file(small_ex_txt)
+        assert platform.spin_cycle().to_lines() == [
+            '.....#....',
+            '....#...O#',
+            '...OO##...',
+            '.OO#......',
+            '.....OOO#.',
+            '.O#...O#.#',
+            '....O#....',
+            '......OOOO',
+            '#...O###..',
+            '#..OO#....',
+        ]
+        assert platform.spin(2).to_lines() == [
+            '.....#....',
+            '....#...O#',
+            '.....##...',
+            '..O#......',
+            '.....OOO#.',
+            '.O#...O#.#',
+            '....O#...O',
+            '.......OOO',
+            '#...O###.O',
+            '#.OOO#...O',
+        ]
+
+    @pytest.mark.parametrize('n_cycles', (1, 2, 3, 10, 25))
+    def test_spin_skips_ahead(self, small_ex_txt, n_cycles):
+        platform = Platform.from_file(small_ex_txt)
+        for _ in range(n_cycles):
+            platform.spin_cycle()
+        assert Platform.from_file(small_ex_txt).spin(n_cycles) == platform
+
+
+class TestSpinningPlatform:
+    def test_missing_override(self):
+        class NoFingerprint(SpinningPlatform):
+            def tilt(self, direction):
+                return self
+
+        with pytest.raises(TypeError):
+            NoFingerprint()
+
+
+class TestBitPlatform:
+    def test_round_trip(self, small_ex_txt):
+        platform = Platform.from_file(small_ex_txt)
+        assert BitPlatform.from_platform(platform).to_platform() == platform
+
+    @pytest.mark.parametrize('direction', (North, South, East, West))
+    def test_tilt(self, small_ex_txt, direction):
+        platform = Platform.from_file(small_ex_txt)
+        bit_platform = BitPlatform.from_platform(platform)
+        assert bit_platform.tilt(direction).to_lines() == platform.tilt(direction).to_lines()
+
+    @pytest.mark.parametrize('n_cycles', (1, 3, 1000))
+    def test_spin(self, small_ex_txt, n_cycles):
+        platform = Platform.from_file(small_ex_txt).spin(n_cycles)
+        bit_platform = BitPlatform.from_file(small_ex_txt).spin(n_cycles)
+        assert bit_platform.to_platform() == platform
+        assert bit_platform.north_load() == platform.north_load()
+
+    @pytest.mark.parametrize('direction', (North, South, East, West))
+    def test_tilt_sparse(self, sparse_platform, direction):
+        bit_platform = BitPlatform.from_platform(sparse_platform)
+        assert bit_platform.tilt(direction).to_platform() == sparse_platform.tilt(direction)
+
+    def test_tilt_long_column(self, sparse_platform):
+        bit_platform = BitPlatform.from_platform(sparse_platform).tilt_north()
+        assert bit_platform.to_lines()[0][0] == 'O'
+        assert all(line[0] == '.' for line in bit_platform.to_lines()[1:])
+
+    def test_spin_sparse(self, sparse_platform):
+        bit_platform = BitPlatform.from_platform(sparse_platform).spin(3)
+        assert bit_platform.to_platform() == sparse_platform.spin(3)
+        assert bit_platform.north_load() == sparse_platform.north_load()
+
+    def test_q1_input(self, input_txt):
+        assert q1(BitPlatform.from_file(input_txt)) == 106648
+
+    def test_q2_input(self, input_txt):
+        assert q2(BitPlatform.from_file(input_txt)) == 87700
+
+
 class TestQ1:
     def test_small_ex(self, small_ex_txt):
         assert q1(Platform.from_file(small_ex_txt)) == 136
 
     def test_input(self, input_txt):
         assert q1(Platform.from_file(input_txt)) == 106648
+
+
+class TestQ2:
+    def test_small_ex(self, small_ex_txt):
+        assert q2(Platform.from_file(small_ex_txt)) == 64
+
+    def test_input(self, input_txt):
+        assert q2(Platform.from_file(input_txt)) == 87700
@@ -1,12 +1,17 @@
 import dataclasses
+import mmap
+import os
 import re
 from argparse import ArgumentParser
+from array import array
 from typing import (
     ClassVar,
     Dict,
+    Iterator,
     List,
     Optional,
     Self,
+    Tuple,
 )
 
 
@@ -18,6 +23,38 @@ def hash_step(step: str) -> int:
     return current
 
 
+def _hash_step_bytes(step: bytes) -> int:
+    current = 0
+    for c in step:
+        current = (current + c) * 17 & 255
+    return current
+
+
+def hash_split_steps(steps: List[bytes], block_size: int = 4096) -> array:
+    """hash_step of every step.
+
+    Steps are read a block at a time and each distinct step is hashed once. Once two blocks are
+    done, if more than half the steps so far had to be hashed the memo does not pay and the rest
+    are all hashed in turn.
+    """
+    hashes = array('B')
+    known: Dict[bytes, int] = {}
+    n_hashed = 0
+    for start in range(0, len(steps), block_size):
+        block = steps[start : start + block_size]
+        new_steps = set(block).difference(known)
+        for step in new_steps:
+            known[step] = _hash_step_bytes(step)
+        hashes.extend(map(known.__getitem__, block))
+
+        n_hashed += len(new_steps)
+        n_done = start + len(block)
+        if n_done >= 2 * block_size and 2 * n_hashed > n_done:
+            hashes.extend(map(_hash_step_bytes, steps[n_done:]))
+            break
+    return hashes
+
+
 @dataclasses.dataclass
 class Lens:
     focal: int
@@ -98,35 +135,137 @@ class BoxSystem:
         return sum((box.get_focusing_power(i) for i, box in enumerate(self.boxes, start=1)))
 
 
+class OrderedBoxSystem:
+    """Same as BoxSystem but boxes are insertion-ordered label -> focal dicts.
+
+    Updating a label keeps its place in the dict, which is what the lenses do in their box. The
+    focusing power is kept up to date on each step so it can be read at any time.
+    """
+
+    def __init__(self):
+        self.boxes: List[Dict[str, int]] = [{} for _ in range(256)]
+        self._box_powers: List[int] = [0] * 256
+        self._box_ids: Dict[str, int] = {}
+        self.focusing_power = 0
+
+    def _box_id(self, label: str) -> int:
+        box_id = self._box_ids.get(label)
+        if box_id is None:
+            box_id = self._box_ids[label] = hash_step(label)
+        return box_id
+
+    def _update_power(self, box_id: int, box_power: int):
+        self.focusing_power += (box_id + 1) * (box_power - self._box_powers[box_id])
+        self._box_powers[box_id] = box_power
+
+    def _refresh_power(self, box_id: int):
+        box_power = sum(i * focal for i, focal in enumerate(self.boxes[box_id].values(), start=1))
+        self._update_power(box_id, box_power)
+
+    def add(self, label: str, focal: int):
+        box_id = self._box_id(label)
+        box = self.boxes[box_id]
+        if label in box:
+            box[label] = focal
+            self._refresh_power(box_id)
+        else:
+            box[label] = focal
+            self._update_power(box_id, self._box_powers[box_id] + len(box) * focal)
+
+    def remove(self, label: str):
+        box_id = self._box_id(label)
+        if self.boxes[box_id].pop(label, None) is not None:
+            self._refresh_power(box_id)
+
+    def apply(self, action: str):
+        if action.endswith('-'):
+            self.remove(action[:-1])
+        else:
+            label, sep, focal_str = action.partition('=')
+            if not sep or not focal_str.isdigit():
+                raise ValueError(f'Unexpected {action}')
+            self.add(label, int(focal_str))
+
+    def load(self, init_seq: 'InitSeq') -> Self:
+        for action in init_seq.steps:
+            self.apply(action)
+        return self
+
+    def get_focusing_power(self) -> int:
+        return self.focusing_power
+
+
 @dataclasses.dataclass(frozen=True)
 class InitSeq:
     steps: List[str]
 
     def checksum(self) -> int:
-        return sum(hash_step(step) for step in self.steps)
+        return sum(map(hash_step, self.steps))
+
+    @classmethod
+    def iter_chunks(cls, filename: str, chunk_size: int = 1 << 24) -> Iterator[List[bytes]]:
+        """Yield the steps of the file a chunk at a time, reading it through mmap.
+
+        Chunks are cut on the first comma or new line after chunk_size bytes.
+        """
+        with open(filename, 'rb') as fin:
+            if os.fstat(fin.fileno()).st_size == 0:
+                return  # cannot mmap an empty file
+            with mmap.mmap(fin.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                start = 0
+                while start < len(buffer):
+                    end = len(buffer)
+                    if start + chunk_size < end:
+                        for separator in (b',', b'\n'):
+                            separator_at = buffer.find(separator, start + chunk_size, end)
+                            if separator_at >= 0:
+                                end = separator_at
+
+                    chunk = buffer[start:end]
+                    if b'\n' in chunk:
+                        chunk = chunk.replace(b'\n', b',')
+                    steps = chunk.split(b',')
+                    if b'' in steps:
+                        steps = [step for step in steps if step]
+                    if steps:
+                        yield steps
+                    start = end + 1
+
+    @classmethod
+    def iter_steps(cls, filename: str, chunk_size: int = 1 << 24) -> Iterator[str]:
+        for steps in cls.iter_chunks(filename, chunk_size):
+            for step in steps:
+                yield step.decode()
 
     @classmethod
     def from_file(cls, filename: str) -> Self:
         print(f'Loading {filename}')
-        with open(filename, 'r') as fin:
-            steps = []
-            for line in fin:
-                line = line.replace('\n', '')
-                steps.extend(line.split(','))
-
+        steps = list(cls.iter_steps(filename))
         print(f'  -> loaded {len(steps)} steps')
         return cls(steps)
 
 
+def stream_file(filename: str, chunk_size: int = 1 << 24) -> Tuple[int, int]:
+    """Checksum and focusing power of the file in one pass, only a chunk of it is held at once"""
+    print(f'Streaming {filename}')
+    checksum = 0
+    boxes = OrderedBoxSystem()
+    for steps in InitSeq.iter_chunks(filename, chunk_size):
+        checksum += sum(hash_split_steps(steps))
+        for step in steps:
+            boxes.apply(step.decode())
+    return checksum, boxes.get_focusing_power()
+
+
 def q2(init_seq: InitSeq) -> int:
-    return BoxSystem().load(init_seq).get_focusing_power()
+    return OrderedBoxSystem().load(init_seq).get_focusing_power()
 
 
 def main(filename: str):
-    seq = InitSeq.from_file(filename)
+    checksum, focusing_power = stream_file(filename)
 
-    print(f'Q1: checksum is {seq.checksum()}')
-    print(f'Q2: focus power {q2(seq)}')
+    print(f'Q1: checksum is {checksum}')
+    print(f'Q2: focus power {focusing_power}')
 
 
 if __name__ == '__main__':
@@ -3,9 +3,13 @@ import os
 import pytest
 
 from day_15.compute import (
+    BoxSystem,
     InitSeq,
+    OrderedBoxSystem,
+    hash_split_steps,
     hash_step,
     q2,
+    stream_file,
 )
 
 
@@ -36,6 +40,13 @@ class TestHashStep:
     def test_hash_step(self, step, hash_v):
         assert hash_step(step) == hash_v
 
+    @pytest.mark.parametrize('repeat', (1, 3))
+    @pytest.mark.parametrize('block_size', (16, 4096))
+    def test_hash_split_steps(self, input_txt, repeat, block_size):
+        steps = InitSeq.from_file(input_txt).steps * repeat
+        hashes = hash_split_steps([step.encode() for step in steps], block_size=block_size)
+        assert list(hashes) == [hash_step(step) for step in steps]
+
     def test_load_input(self, input_txt):
         data = InitSeq.from_file(input_txt)
         assert len(data.steps) == 4000
@@ -55,3 +66,45 @@ class TestQ2:
 
     def test_input(self, input_txt):
         assert q2(InitSeq.from_file(input_txt)) == 212763
+
+    @pytest.mark.parametrize('box_system', (BoxSystem, OrderedBoxSystem))
+    def test_box_systems(self, input_txt, box_system):
+        assert box_system().load(InitSeq.from_file(input_txt)).get_focusing_power() == 212763
+
+    def test_incremental_power(self, small_ex_txt):
+        steps = InitSeq.from_file(small_ex_txt).steps
+        boxes = OrderedBoxSystem()
+        for i, action in enumerate(steps, start=1):
+            boxes.apply(action)
+            expected = BoxSystem().load(InitSeq(steps[:i]))
+            assert boxes.get_focusing_power() == expected.get_focusing_power()
+
+    @pytest.mark.parametrize('action', ('rn', 'rn=', 'rn=x'))
+    def test_unexpected_action(self, action):
+        with pytest.raises(ValueError):
+            OrderedBoxSystem().apply(action)
+
+
+class TestStreamFile:
+    @pytest.mark.parametrize('chunk_size', (1, 100, 1 << 24))
+    def test_iter_steps(self, input_txt, chunk_size):
+        steps = InitSeq.from_file(input_txt).steps
+        assert list(InitSeq.iter_steps(input_txt, chunk_size=chunk_size)) == steps
+
+    def test_new_lines(self, tmp_path):
+        filename = tmp_path / 'lines.txt'
+        filename.write_text('rn=1\ncm-\nqp=3,cm=2\n')
+        assert [len(steps) for steps in InitSeq.iter_chunks(str(filename), chunk_size=1)] == [1, 1, 1, 1]
+        assert list(InitSeq.iter_steps(str(filename))) == ['rn=1', 'cm-', 'qp=3', 'cm=2']
+
+    def test_empty_file(self, tmp_path):
+        filename = tmp_path / 'empty.txt'
+        filename.write_text('')
+        assert stream_file(str(filename)) == (0, 0)
+
+    @pytest.mark.parametrize('chunk_size', (1, 1 << 24))
+    def test_small_ex(self, small_ex_txt, chunk_size):
+        assert stream_file(small_ex_txt, chunk_size=chunk_size) == (1320, 145)
+
+    def test_input(self, input_txt):
+        assert stream_file(input_txt) == (510801, 212763)